@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, SocialMediaAccount, APICallLog, UserAnalytics, SessionData
+from .models import UserProfile, SocialMediaAccount, APICallLog, APICallRollup, UserAnalytics, SessionData
 
 
 @admin.register(UserProfile)
@@ -42,15 +42,50 @@ class SocialMediaAccountAdmin(admin.ModelAdmin):
     )
 
 
+class APICallPlatformFilter(admin.SimpleListFilter):
+    """Platform filter that resolves accounts in the main database (logs live in the telemetry one)"""
+    title = 'platform'
+    parameter_name = 'platform'
+    
+    def lookups(self, request, model_admin):
+        return SocialMediaAccount.PLATFORM_CHOICES
+    
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        account_ids = list(SocialMediaAccount.objects.filter(platform=self.value()).values_list('id', flat=True))
+        return queryset.filter(social_account_id__in=account_ids)
+
+
 @admin.register(APICallLog)
 class APICallLogAdmin(admin.ModelAdmin):
-    list_display = ('social_account', 'endpoint', 'method', 'status_code', 'response_time', 'created_at')
-    list_filter = ('social_account__platform', 'method', 'status_code', 'created_at')
-    search_fields = ('endpoint', 'social_account__username')
+    list_display = ('social_account', 'endpoint', 'method', 'status_code', 'response_time', 'attempt', 'sample_weight', 'created_at')
+    list_filter = (APICallPlatformFilter, 'method', 'status_code', 'created_at')
+    search_fields = ('endpoint',)
     readonly_fields = ('created_at',)
+    raw_id_fields = ('user', 'social_account')
+    list_select_related = ()  # The changelist would otherwise join the accounts in list_display
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('social_account', 'user')
+        # Accounts and users are in another database, so prefetch instead of joining
+        return super().get_queryset(request).prefetch_related('social_account', 'user')
+    
+    def get_search_results(self, request, queryset, search_term):
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            account_ids = list(
+                SocialMediaAccount.objects.filter(username__icontains=search_term).values_list('id', flat=True)
+            )
+            queryset |= self.model.objects.filter(social_account_id__in=account_ids)
+        return queryset, may_have_duplicates
+
+
+@admin.register(APICallRollup)
+class APICallRollupAdmin(admin.ModelAdmin):
+    list_display = ('platform', 'endpoint', 'status_class', 'granularity', 'bucket_start', 'count', 'error_count')
+    list_filter = ('platform', 'granularity', 'status_class')
+    search_fields = ('endpoint',)
+    readonly_fields = ('updated_at',)
 
 
 @admin.register(UserAnalytics)
@@ -67,8 +102,8 @@ class UserAnalyticsAdmin(admin.ModelAdmin):
 
 @admin.register(SessionData)
 class SessionDataAdmin(admin.ModelAdmin):
-    list_display = ('user', 'social_account', 'oauth_state', 'expires_at', 'created_at')
-    list_filter = ('expires_at', 'created_at')
+    list_display = ('user', 'social_account', 'platform', 'oauth_state', 'expires_at', 'created_at')
+    list_filter = ('platform', 'expires_at', 'created_at')
     search_fields = ('user__username', 'oauth_state')
     readonly_fields = ('created_at',)
     
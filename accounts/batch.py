@@ -0,0 +1,39 @@
+"""
+Batch execution helpers for APIClient.execute_batch()
+"""
+REQUEST_KEYS = ('endpoint', 'method', 'params', 'data', 'headers')
+
+
+def as_request(item):
+    """Normalise a batch item (endpoint string or dict) to make_request() kwargs"""
+    if isinstance(item, str):
+        return {'endpoint': item}
+    unknown = set(item) - set(REQUEST_KEYS)
+    if unknown or 'endpoint' not in item:
+        raise ValueError(f"Invalid batch request {item!r}: expected 'endpoint' plus any of {REQUEST_KEYS[1:]}")
+    return dict(item)
+
+
+class BatchResult:
+    """Outcome of one batch item; failures are reported here instead of raised"""
+
+    def __init__(self, request, data=None, status_code=None, error=None):
+        self.request = request
+        self.data = data
+        self.status_code = status_code
+        self.error = error
+
+    @classmethod
+    def from_response(cls, request, data, status_code):
+        if data is None:
+            error = f"HTTP {status_code}" if status_code else 'Request failed before a response was received'
+            return cls(request, status_code=status_code, error=error)
+        return cls(request, data=data, status_code=status_code)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        outcome = 'ok' if self.ok else self.error
+        return f"<BatchResult {self.request['endpoint']} {self.status_code}: {outcome}>"
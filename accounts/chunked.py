@@ -0,0 +1,31 @@
+"""
+Chunked deletion of expired rows
+
+One DELETE over a large expired range holds SQLite's write lock for as long
+as it runs. delete_in_chunks() walks an ordered queryset through its index
+instead. It picks at most chunk_size primary keys, deletes exactly those
+rows in their own short statement, and sleeps briefly so request traffic
+can take the lock in between.
+"""
+import time
+
+
+def delete_in_chunks(expired, chunk_size, pause=0, on_chunk=None):
+    """Delete an ordered queryset's rows chunk_size at a time and return how many were deleted
+
+    on_chunk(deleted) is called after every chunk with that chunk's count.
+    """
+    deleted = 0
+    keys = expired.values_list('pk', flat=True)
+    while True:
+        ids = list(keys[:chunk_size])
+        if not ids:
+            return deleted
+        # Callers pass models nothing references, so this is a single DELETE ... WHERE pk IN (...)
+        chunk = expired.model._default_manager.filter(pk__in=ids).delete()[0]
+        deleted += chunk
+        if on_chunk:
+            on_chunk(chunk)
+        if len(ids) < chunk_size:
+            return deleted
+        time.sleep(pause)
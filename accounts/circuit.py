@@ -0,0 +1,205 @@
+"""
+Per-platform circuit breaker for outbound API calls
+
+While a platform is failing or crawling, waiting on every call only piles
+up blocked requests and error rows. The breaker counts calls, errors (5xx
+and connection failures) and slow calls in a fixed window. Once either
+rate crosses its threshold, the circuit opens and calls fail fast with
+CircuitOpenError. After OPEN_SECONDS a single probe call is let through
+(half-open): its success closes the circuit and its failure re-opens it.
+
+State lives in the cache named by CIRCUIT_BREAKER['CACHE'], so every
+worker process trips and recovers together. The counters rely on the
+cache's atomic incr() (see accounts.ratelimit). Each process also
+remembers the circuits it opened, so a state entry evicted from the cache
+does not silently close them. Scopes are per platform, or per platform
+and endpoint template when PER_ENDPOINT is set.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from accounts.ratelimit import endpoint_template, warn_if_not_atomic
+
+DEFAULT_CIRCUIT_BREAKER_SETTINGS = {
+    'CACHE': None,  # Cache alias; defaults to settings.RATE_LIMIT_CACHE
+    'WINDOW': 60,  # Seconds of traffic the error and slow rates are computed over
+    'MIN_CALLS': 20,  # Calls in a window before the rates are trusted
+    'ERROR_RATE': 0.5,
+    'SLOW_CALL_SECONDS': 5.0,
+    'SLOW_CALL_RATE': 0.8,
+    'OPEN_SECONDS': 30,  # How long an open circuit rejects calls before probing
+    'PER_ENDPOINT': False,
+}
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+# (cache alias, scope) -> state of circuits this process opened, in case the cache loses them
+_opened_here = {}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a platform whose circuit is open"""
+
+    def __init__(self, scope, retry_after):
+        self.scope = scope
+        self.retry_after = retry_after
+        super().__init__(f"Circuit for {scope} is open, retry in {retry_after:.0f}s")
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by error rate and latency"""
+
+    def __init__(self, cache_alias=None, window=60, min_calls=20, error_rate=0.5, slow_call_seconds=5.0,
+                 slow_call_rate=0.8, open_seconds=30, per_endpoint=False):
+        self.cache_alias = cache_alias or getattr(settings, 'RATE_LIMIT_CACHE', 'default')
+        self.cache = caches[self.cache_alias]
+        warn_if_not_atomic(self.cache_alias, self.cache)
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.per_endpoint = per_endpoint
+
+    @classmethod
+    def from_settings(cls):
+        """Build the breaker from DEFAULT_CIRCUIT_BREAKER_SETTINGS overridden by settings.CIRCUIT_BREAKER"""
+        config = {**DEFAULT_CIRCUIT_BREAKER_SETTINGS, **getattr(settings, 'CIRCUIT_BREAKER', {})}
+        return cls(
+            cache_alias=config['CACHE'],
+            window=config['WINDOW'],
+            min_calls=config['MIN_CALLS'],
+            error_rate=config['ERROR_RATE'],
+            slow_call_seconds=config['SLOW_CALL_SECONDS'],
+            slow_call_rate=config['SLOW_CALL_RATE'],
+            open_seconds=config['OPEN_SECONDS'],
+            per_endpoint=config['PER_ENDPOINT'],
+        )
+
+    def scope(self, platform, endpoint=None):
+        if self.per_endpoint and endpoint:
+            return f"{platform}:{endpoint_template(endpoint)}"
+        return platform
+
+    @staticmethod
+    def _key(scope, suffix):
+        digest = hashlib.blake2b(scope.encode(), digest_size=8).hexdigest()
+        return f"circuit:{digest}:{suffix}"
+
+    def _counter_keys(self, scope, now):
+        window_id = int(now // self.window)
+        return [self._key(scope, f"{window_id}:{name}") for name in ('calls', 'errors', 'slow')]
+
+    def allow(self, platform, endpoint=None):
+        """Raise CircuitOpenError if the call must not be sent; return True if it is the half-open probe"""
+        scope = self.scope(platform, endpoint)
+        now = time.time()
+        state = self._state(scope, now)
+        if not state:
+            return False
+
+        if now < state['open_until']:
+            raise CircuitOpenError(scope, state['open_until'] - now)
+
+        # Exactly one caller across all workers gets to probe the platform
+        if self.cache.add(self._key(scope, 'probe'), True, timeout=max(self.open_seconds, 1)):
+            return True
+        raise CircuitOpenError(scope, self.open_seconds)
+
+    def release_probe(self, platform, endpoint=None):
+        """Give back a half-open probe slot that allow() handed out for a call never sent"""
+        self.cache.delete(self._key(self.scope(platform, endpoint), 'probe'))
+
+    def record(self, platform, endpoint, status_code, elapsed, probe=False):
+        """Count a finished call (status 0 for a connection failure) and trip or reset the circuit"""
+        scope = self.scope(platform, endpoint)
+        failed = status_code == 0 or status_code >= 500
+        slow = elapsed >= self.slow_call_seconds
+
+        if probe:
+            if failed or slow:
+                self._open(scope)
+            else:
+                self.reset(platform, endpoint)
+            return
+
+        now = time.time()
+        calls_key, errors_key, slow_key = self._counter_keys(scope, now)
+        calls = self._incr(calls_key)
+        errors = self._incr(errors_key) if failed else None
+        slow_calls = self._incr(slow_key) if slow else None
+        if calls < self.min_calls or (errors is None and slow_calls is None):
+            return
+
+        if (errors or 0) / calls >= self.error_rate or (slow_calls or 0) / calls >= self.slow_call_rate:
+            self._open(scope)
+
+    def status(self, platform, endpoint=None):
+        """Current state and window counters of a scope, for monitoring"""
+        scope = self.scope(platform, endpoint)
+        now = time.time()
+        state = self._state(scope, now)
+        counters = self.cache.get_many(self._counter_keys(scope, now))
+        calls, errors, slow = (counters.get(key, 0) for key in self._counter_keys(scope, now))
+
+        if not state:
+            name, retry_after = CLOSED, 0
+        elif now < state['open_until']:
+            name, retry_after = OPEN, state['open_until'] - now
+        else:
+            name, retry_after = HALF_OPEN, 0
+        return {
+            'scope': scope, 'state': name, 'retry_after': retry_after,
+            'opened_at': state['opened_at'] if state else None,
+            'calls': calls, 'errors': errors, 'slow': slow,
+        }
+
+    def tripped_scopes(self):
+        """Scopes that have opened at least once, newest first"""
+        tripped = self.cache.get('circuit:tripped') or {}
+        return sorted(tripped, key=tripped.get, reverse=True)
+
+    def reset(self, platform, endpoint=None):
+        """Close a circuit and forget its window"""
+        scope = self.scope(platform, endpoint)
+        _opened_here.pop((self.cache_alias, scope), None)
+        self.cache.delete_many([
+            self._key(scope, 'state'), self._key(scope, 'probe'), *self._counter_keys(scope, time.time()),
+        ])
+
+    def _state(self, scope, now):
+        state = self.cache.get(self._key(scope, 'state'))
+        if state:
+            return state
+        # Evicted from the cache (or never there): fall back to what this process opened
+        state = _opened_here.get((self.cache_alias, scope))
+        if state and now >= state['open_until'] + self.window:
+            _opened_here.pop((self.cache_alias, scope), None)
+            return None
+        return state
+
+    def _open(self, scope):
+        now = time.time()
+        state = {'opened_at': now, 'open_until': now + self.open_seconds}
+        # Outlive open_until so the half-open probe can still find the state
+        self.cache.set(self._key(scope, 'state'), state, timeout=self.open_seconds + self.window)
+        _opened_here[(self.cache_alias, scope)] = state
+        self.cache.delete_many([self._key(scope, 'probe'), *self._counter_keys(scope, now)])
+
+        tripped = self.cache.get('circuit:tripped') or {}
+        tripped[scope] = now
+        self.cache.set('circuit:tripped', tripped, timeout=None)
+        print(f"🔌 Circuit for {scope} opened for {self.open_seconds}s")
+
+    def _incr(self, key):
+        self.cache.add(key, 0, timeout=self.window * 2)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.set(key, 1, timeout=self.window * 2)
+            return 1
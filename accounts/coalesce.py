@@ -0,0 +1,89 @@
+"""
+In-flight request coalescing for identical platform GETs
+
+When a dashboard refresh and a background sync ask for the same endpoint
+of the same account at the same moment, only the first caller (the leader)
+goes out to the platform; everyone who arrives while that call is in
+flight waits for it and receives the same parsed result. That is one
+outbound call, one rate-limit unit and one APICallLog row per burst.
+Threads coalesce with threads and coroutines with coroutines on the same
+event loop; nothing is shared across processes.
+"""
+import asyncio
+import json
+import threading
+import weakref
+
+
+def request_key(social_account, endpoint, params=None, headers=None):
+    """Identity of a GET: same account, endpoint, params and extra headers"""
+    return json.dumps(
+        [social_account.id, endpoint.lstrip('/'), params or {}, headers or {}], sort_keys=True, default=str,
+    )
+
+
+class _Call:
+    """A leader's in-flight call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        # Event loop -> {key: Task}; tasks are bound to their loop
+        self._tasks = weakref.WeakKeyDictionary()
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """Run func() once for all threads that ask for key while it is running"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key, func):
+        """Await func() once for all coroutines on this loop that ask for key while it is running"""
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.get(loop)
+        if tasks is None:
+            tasks = self._tasks[loop] = {}
+
+        task = tasks.get(key)
+        if task is None:
+            task = tasks[key] = loop.create_task(func())
+            task.add_done_callback(lambda finished: tasks.pop(key, None) if tasks.get(key) is finished else None)
+        else:
+            self.coalesced += 1
+
+        # A cancelled caller must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+
+inflight_requests = SingleFlight()
@@ -0,0 +1,167 @@
+"""
+Token encryption backed by the cryptography package
+
+Ciphertexts are written as a versioned envelope, ``v1:<key id>:<payload>``,
+where the key id names the secret (SECRET_KEY or one of
+SECRET_KEY_FALLBACKS) the AES-GCM key was derived from. Rotating
+SECRET_KEY therefore keeps old tokens readable until the
+``rotate_token_keys`` command has re-encrypted them.
+
+Unauthenticated XOR ciphertext from before AES-GCM decrypts to *something*
+under any key, so it is only ever tried with one secret: LEGACY_TOKEN_SECRET
+if set, else the oldest configured key (the last of SECRET_KEY_FALLBACKS).
+Keep that secret configured until ``rotate_token_keys`` has migrated those
+rows.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from django.conf import settings
+
+ENVELOPE_VERSION = 'v1'
+NONCE_SIZE = 12
+
+_DECRYPT_ERRORS = (InvalidTag, ValueError, binascii.Error)
+
+# OAuth tokens are printable ASCII without whitespace; an XOR result that is not came from the wrong key
+_PLAUSIBLE_TOKEN = re.compile(r'[\x21-\x7e]+\Z')
+
+
+@lru_cache(maxsize=None)
+def _get_engine(secret):
+    """Derive the AES-GCM key and its key id for a secret once per process"""
+    key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b'connectly.accounts.token-cipher',
+    ).derive(secret.encode())
+    key_id = hashlib.sha256(key).hexdigest()[:8]
+    return key_id, AESGCM(key)
+
+
+@lru_cache(maxsize=8)
+def _get_keyring(secrets):
+    """Map key id to engine for the active secret and its fallbacks"""
+    return {key_id: engine for key_id, engine in map(_get_engine, secrets)}
+
+
+def _active_secrets():
+    return (settings.SECRET_KEY, *getattr(settings, 'SECRET_KEY_FALLBACKS', ()))
+
+
+def _legacy_secret():
+    """The single secret XOR-era tokens are decrypted with"""
+    return getattr(settings, 'LEGACY_TOKEN_SECRET', None) or _active_secrets()[-1]
+
+
+def _legacy_xor_decrypt(encrypted_token, secret):
+    """Decrypt a token written by the old XOR scheme, rejecting implausible plaintext"""
+    encrypted_bytes = base64.b64decode(encrypted_token.encode(), validate=True)
+    key = secret.encode()
+    keystream = (key * (len(encrypted_bytes) // len(key) + 1))[:len(encrypted_bytes)]
+    decrypted = int.from_bytes(encrypted_bytes, 'big') ^ int.from_bytes(keystream, 'big')
+    plaintext = decrypted.to_bytes(len(encrypted_bytes), 'big').decode()
+    if not _PLAUSIBLE_TOKEN.match(plaintext):
+        raise ValueError("XOR plaintext is not a token; wrong legacy secret")
+    return plaintext
+
+
+def _encrypt(key_id, engine, token):
+    nonce = os.urandom(NONCE_SIZE)
+    payload = base64.urlsafe_b64encode(nonce + engine.encrypt(nonce, token.encode(), None)).decode()
+    return f"{ENVELOPE_VERSION}:{key_id}:{payload}"
+
+
+def _decrypt_payload(engine, payload):
+    raw = base64.urlsafe_b64decode(payload.encode())
+    return engine.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], None).decode()
+
+
+def _decrypt_unversioned(encrypted_token, secrets):
+    """Decrypt ciphertext written before the envelope existed"""
+    for secret in secrets:
+        try:
+            return _decrypt_payload(_get_engine(secret)[1], encrypted_token)
+        except _DECRYPT_ERRORS:
+            pass
+
+    # Rows stored before the switch to AES-GCM still hold XOR ciphertext. XOR cannot
+    # tell a wrong key from the right one, so only the legacy secret is tried
+    try:
+        return _legacy_xor_decrypt(encrypted_token, _legacy_secret())
+    except Exception:
+        return ""
+
+
+class TokenCipher:
+    """Encrypt and decrypt OAuth tokens with AES-GCM keyed from SECRET_KEY"""
+
+    @staticmethod
+    def active_key_id():
+        """Key id new ciphertexts are written under"""
+        return _get_engine(settings.SECRET_KEY)[0]
+
+    @staticmethod
+    def encrypt(token):
+        """Encrypt a single token"""
+        if not token:
+            return ""
+        return _encrypt(*_get_engine(settings.SECRET_KEY), token)
+
+    @staticmethod
+    def decrypt(encrypted_token):
+        """Decrypt a single token, returning an empty string on failure"""
+        if not encrypted_token:
+            return ""
+
+        secrets = _active_secrets()
+        version, _, rest = encrypted_token.partition(':')
+        if version != ENVELOPE_VERSION:
+            return _decrypt_unversioned(encrypted_token, secrets)
+
+        key_id, _, payload = rest.partition(':')
+        engine = _get_keyring(secrets).get(key_id)
+        if engine is None:
+            return ""
+        try:
+            return _decrypt_payload(engine, payload)
+        except _DECRYPT_ERRORS:
+            return ""
+
+    @staticmethod
+    def needs_rotation(encrypted_token):
+        """True if the ciphertext is not an envelope under the active key"""
+        if not encrypted_token:
+            return False
+        return not encrypted_token.startswith(f"{ENVELOPE_VERSION}:{TokenCipher.active_key_id()}:")
+
+    @staticmethod
+    def encrypt_many(tokens):
+        """Encrypt a sequence of tokens, preserving order"""
+        key_id, engine = _get_engine(settings.SECRET_KEY)
+        return [_encrypt(key_id, engine, token) if token else "" for token in tokens]
+
+    @staticmethod
+    def decrypt_many(encrypted_tokens):
+        """Decrypt a sequence of tokens, preserving order"""
+        key_id, engine = _get_engine(settings.SECRET_KEY)
+        prefix = f"{ENVELOPE_VERSION}:{key_id}:"
+        decrypted = []
+        for encrypted_token in encrypted_tokens:
+            if encrypted_token and encrypted_token.startswith(prefix):
+                try:
+                    decrypted.append(_decrypt_payload(engine, encrypted_token[len(prefix):]))
+                    continue
+                except _DECRYPT_ERRORS:
+                    pass
+            decrypted.append(TokenCipher.decrypt(encrypted_token))
+        return decrypted
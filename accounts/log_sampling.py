@@ -0,0 +1,74 @@
+"""
+Sampling policy for APICallLog persistence
+
+Every error, 429 and slow call is logged. Successful fast calls are kept
+with probability RATE, which can be configured per platform or per
+platform and endpoint, and each kept row stores sample_weight = 1 / RATE,
+the number of calls it stands for. Aggregates must sum sample_weight
+rather than count rows; weighted_call_stats() does that, so reports stay
+unbiased whatever the rates are.
+"""
+import random
+
+from django.conf import settings
+from django.db.models import F, Q, Sum
+
+DEFAULT_LOG_SAMPLING_SETTINGS = {
+    'DEFAULT_RATE': 1.0,  # Fraction of successful fast calls logged; 1.0 logs everything
+    'SLOW_CALL_SECONDS': 2.0,  # Calls at least this slow are always logged
+    'RATES': {},  # '<platform>' or '<platform>:<endpoint>' -> rate, most specific wins
+}
+
+
+class LogSampler:
+    """Decide whether a call is logged and how many calls its row represents"""
+
+    def __init__(self, default_rate=1.0, slow_call_seconds=2.0, rates=None, random_func=random.random):
+        self.default_rate = default_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.rates = rates or {}
+        self.random_func = random_func
+
+    @classmethod
+    def from_settings(cls):
+        """Build the sampler from DEFAULT_LOG_SAMPLING_SETTINGS overridden by settings.API_LOG_SAMPLING"""
+        config = {**DEFAULT_LOG_SAMPLING_SETTINGS, **getattr(settings, 'API_LOG_SAMPLING', {})}
+        return cls(
+            default_rate=config['DEFAULT_RATE'],
+            slow_call_seconds=config['SLOW_CALL_SECONDS'],
+            rates=config['RATES'],
+        )
+
+    def rate_for(self, platform, endpoint):
+        endpoint = endpoint.lstrip('/')
+        for key in (f"{platform}:{endpoint}", platform):
+            if key in self.rates:
+                return self.rates[key]
+        return self.default_rate
+
+    def sample_weight(self, platform, endpoint, status_code, response_time):
+        """Weight to store with the row, or 0 if the call should not be logged"""
+        if status_code not in (200, 304) or response_time >= self.slow_call_seconds:
+            return 1.0
+
+        rate = self.rate_for(platform, endpoint)
+        if rate >= 1:
+            return 1.0
+        if rate <= 0 or self.random_func() >= rate:
+            return 0
+        return 1.0 / rate
+
+
+def weighted_call_stats(queryset):
+    """Estimated calls, errors and mean response time for a filtered APICallLog queryset"""
+    totals = queryset.aggregate(
+        calls=Sum('sample_weight'),
+        errors=Sum('sample_weight', filter=~Q(status_code__in=(200, 304))),
+        weighted_time=Sum(F('response_time') * F('sample_weight')),
+    )
+    calls = totals['calls'] or 0
+    return {
+        'calls': calls,
+        'errors': totals['errors'] or 0,
+        'avg_response_time': totals['weighted_time'] / calls if calls else None,
+    }
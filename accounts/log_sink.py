@@ -0,0 +1,163 @@
+"""
+Buffered writer for APICallLog rows
+
+Inserting one row per API call inside the request serializes all API
+traffic behind SQLite's single writer. Calls instead hand their unsaved
+APICallLog to the sink, which writes them with one bulk_create once
+MAX_BATCH rows are waiting or FLUSH_INTERVAL seconds have passed,
+whichever comes first, and folds each batch into the APICallRollup
+aggregates in the same transaction. A daemon thread handles the
+time-based flushes, and the buffer is flushed again at interpreter exit.
+
+When MAX_QUEUE rows are waiting, for example because the database is
+slow, the submitting caller flushes inline. That blocks the caller as
+backpressure instead of growing memory or dropping rows. If the flush
+fails outright (the telemetry database is locked or missing), the rows go
+back into the buffer, which is then cut back to MAX_QUEUE by dropping the
+oldest rows; `dropped` counts them.
+"""
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, router, transaction
+
+from accounts import rollups
+from accounts.models import APICallLog
+
+DEFAULT_LOG_SINK_SETTINGS = {
+    'MAX_BATCH': 200,  # Rows that trigger an immediate flush
+    'FLUSH_INTERVAL': 1.0,  # Seconds a row may wait before the background flush
+    'MAX_QUEUE': 10000,  # Rows buffered before callers must flush inline
+}
+
+
+class BufferedLogSink:
+    """Collect model instances in memory and bulk_create them by size or age"""
+
+    def __init__(self, model, max_batch=200, flush_interval=1.0, max_queue=10000, on_flush=None):
+        self.model = model
+        self.on_flush = on_flush  # Called with each saved batch, inside the insert's transaction
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        # Held for a whole swap-and-write, so flush() returns only once everything submitted is saved
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_settings(cls, model, on_flush=None):
+        """Build the sink from DEFAULT_LOG_SINK_SETTINGS overridden by settings.API_LOG_SINK"""
+        config = {**DEFAULT_LOG_SINK_SETTINGS, **getattr(settings, 'API_LOG_SINK', {})}
+        return cls(
+            model,
+            max_batch=config['MAX_BATCH'],
+            flush_interval=config['FLUSH_INTERVAL'],
+            max_queue=config['MAX_QUEUE'],
+            on_flush=on_flush,
+        )
+
+    def submit(self, instance):
+        """Queue an unsaved instance for the next flush"""
+        with self._buffer_lock:
+            self._buffer.append(instance)
+            pending = len(self._buffer)
+
+        if self._closed or pending >= self.max_queue:
+            try:
+                self.flush()
+            except DatabaseError as e:
+                print(f"⚠️ API log flush failed with {pending} rows waiting: {e}")
+        elif pending >= self.max_batch:
+            self._wakeup.set()
+        self._ensure_flusher()
+
+    def flush(self):
+        """Write everything buffered so far; safe to call from any thread"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic(using=router.db_for_write(self.model)):
+                    self.model.objects.bulk_create(batch, batch_size=self.max_batch)
+                    if self.on_flush:
+                        self.on_flush(batch)
+            except IntegrityError:
+                # A row points at something deleted since (e.g. a disconnected account)
+                batch = self._save_each(batch)
+                if self.on_flush and batch:
+                    self.on_flush(batch)
+            except DatabaseError:
+                # Keep the rows for the next flush rather than lose them
+                self._requeue(batch)
+                raise
+            self.written += len(batch)
+            return len(batch)
+
+    def _requeue(self, batch):
+        with self._buffer_lock:
+            self._buffer[:0] = batch
+            overflow = len(self._buffer) - self.max_queue
+            if overflow > 0:
+                del self._buffer[:overflow]
+                self.dropped += overflow
+        if overflow > 0:
+            print(f"⚠️ Dropped the {overflow} oldest API log rows; the buffer is capped at {self.max_queue}")
+
+    def _save_each(self, batch):
+        saved = []
+        for instance in batch:
+            try:
+                with transaction.atomic(using=router.db_for_write(self.model)):
+                    instance.save(force_insert=True)
+            except IntegrityError:
+                continue
+            saved.append(instance)
+        if len(saved) < len(batch):
+            print(f"⚠️ Dropped {len(batch) - len(saved)} API log rows for deleted accounts")
+        return saved
+
+    def pending(self):
+        with self._buffer_lock:
+            return len(self._buffer)
+
+    def close(self):
+        """Stop the background flusher and write what is left"""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _ensure_flusher(self):
+        if self._thread is not None or self._closed:
+            return
+        with self._buffer_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='api-log-sink', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except DatabaseError as e:
+                print(f"⚠️ API log flush failed, retrying in {self.flush_interval}s: {e}")
+                time.sleep(self.flush_interval)
+            finally:
+                close_old_connections()
+
+
+api_log_sink = BufferedLogSink.from_settings(APICallLog, on_flush=rollups.record_calls)
+atexit.register(api_log_sink.close)
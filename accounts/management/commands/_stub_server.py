@@ -0,0 +1,111 @@
+"""
+Local stub platform API used by the HTTP benchmarks
+"""
+import datetime
+import json
+import os
+import ssl
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps({'data': {'id': '1', 'path': self.path}}).encode()
+        with self.server.stats_lock:
+            self.server.requests += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _self_signed_context(directory):
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, 'stub.pem')
+    key_path = os.path.join(directory, 'stub.key')
+    with open(cert_path, 'wb') as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class StubServer:
+    """Threaded keep-alive JSON server on 127.0.0.1, optionally over TLS"""
+
+    def __init__(self, tls=True, latency=0.0):
+        self.tls = tls
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.stats_lock = threading.Lock()
+        self.httpd.connections = 0
+        self.httpd.requests = 0
+        if tls:
+            context = _self_signed_context(self._tempdir.name)
+            self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        scheme = 'https' if self.tls else 'http'
+        return f"{scheme}://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def reset_stats(self):
+        with self.httpd.stats_lock:
+            self.httpd.connections = 0
+            self.httpd.requests = 0
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._tempdir.cleanup()
@@ -0,0 +1,73 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts import transport
+from accounts.models import SocialMediaAccount
+from accounts.retry import RetryPolicy
+from accounts.utils import APIClient, TokenManager
+
+from ._stub_server import StubServer
+
+
+class _NoBudget:
+    """Rate limiter stand-in: the stub has no budget to track"""
+
+    max_wait = 0
+
+    def reserve(self, social_account, endpoint):
+        return 0.0
+
+    def record(self, social_account, endpoint, headers):
+        pass
+
+
+class _StubClient(APIClient):
+    """APIClient aimed at the stub that keeps call logging out of the database"""
+
+    def _log_api_call(self, *args, **kwargs):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark APIClient.execute_batch throughput against a local stub API at rising concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Calls per batch')
+        parser.add_argument('--latency-ms', type=float, default=20, help='Simulated platform latency per call')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        # An unsaved account is enough: the token is served from memory and nothing is logged
+        account = SocialMediaAccount(
+            id=0, platform='twitter', status='active',
+            access_token=TokenManager.encrypt_token('bench-access'),
+            token_expires_at=timezone.now() + timedelta(hours=1),
+        )
+
+        with StubServer(tls=False, latency=options['latency_ms'] / 1000) as server:
+            client = _StubClient(account, retry_policy=RetryPolicy(max_attempts=1), rate_limiter=_NoBudget())
+            client.base_url = f"{server.base_url}/2"
+            calls = [f"tweets/{i}" for i in range(count)]
+            client.execute_batch(calls[:max(options['concurrency'])])  # Warm up the pool
+
+            self.stdout.write(f"{count} GETs per batch, {options['latency_ms']:.0f} ms simulated latency")
+            baseline = None
+            for concurrency in options['concurrency']:
+                start = time.perf_counter()
+                results = client.execute_batch(calls, max_concurrency=concurrency)
+                elapsed = time.perf_counter() - start
+
+                failed = sum(not result.ok for result in results)
+                throughput = count / elapsed
+                baseline = baseline or throughput
+                self.stdout.write(
+                    f"concurrency {concurrency:>3}  {elapsed * 1000:9.1f} ms  {throughput:8.1f} req/s  "
+                    f"x{throughput / baseline:5.2f}  {failed} failed"
+                )
+
+        transport.close_sessions()
+        self.stdout.write(self.style.SUCCESS('Done'))
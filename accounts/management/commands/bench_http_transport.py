@@ -0,0 +1,47 @@
+import time
+
+import requests
+import urllib3
+from django.core.management.base import BaseCommand
+
+from accounts import transport
+
+from ._stub_server import StubServer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark pooled keep-alive sessions against per-call requests against a local stub API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Sequential requests per run')
+        parser.add_argument('--plain-http', action='store_true', help='Serve the stub over HTTP instead of TLS')
+
+    def handle(self, *args, **options):
+        # The stub uses a throwaway self-signed certificate
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        count = options['requests']
+
+        with StubServer(tls=not options['plain_http']) as server:
+            url = f"{server.base_url}/2/users/me"
+            cases = [
+                ('requests.get per call', lambda: requests.get(url, verify=False)),
+                ('pooled transport', lambda: transport.get('bench', url, verify=False)),
+            ]
+
+            scheme = 'HTTP' if options['plain_http'] else 'HTTPS'
+            self.stdout.write(f"{count} sequential GETs against a local {scheme} stub")
+            for name, call in cases:
+                call()  # Warm up (the pooled case opens its one connection here)
+                server.reset_stats()
+
+                start = time.perf_counter()
+                for _ in range(count):
+                    call().raise_for_status()
+                elapsed = time.perf_counter() - start
+
+                self.stdout.write(
+                    f"{name:<24} {elapsed * 1000:9.1f} ms  {elapsed / count * 1e6:8.1f} us/request  "
+                    f"{server.connections} new connections"
+                )
+
+        transport.close_sessions()
@@ -0,0 +1,53 @@
+import base64
+import secrets
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.crypto import TokenCipher
+
+
+def _legacy_encrypt(token):
+    """The per-byte XOR loop TokenManager used before TokenCipher"""
+    key = settings.SECRET_KEY.encode()
+    token_bytes = token.encode()
+    encrypted = bytes(a ^ b for a, b in zip(token_bytes, key * (len(token_bytes) // len(key) + 1)))
+    return base64.b64encode(encrypted).decode()
+
+
+def _legacy_decrypt(encrypted_token):
+    key = settings.SECRET_KEY.encode()
+    encrypted_bytes = base64.b64decode(encrypted_token.encode())
+    decrypted = bytes(a ^ b for a, b in zip(encrypted_bytes, key * (len(encrypted_bytes) // len(key) + 1)))
+    return decrypted.decode()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark TokenCipher against the legacy XOR token loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=10000, help='Number of tokens per run')
+        parser.add_argument('--length', type=int, default=120, help='Length of each plaintext token')
+
+    def handle(self, *args, **options):
+        tokens = [secrets.token_urlsafe(options['length'])[:options['length']] for _ in range(options['tokens'])]
+        legacy_ciphertexts = [_legacy_encrypt(token) for token in tokens]
+        ciphertexts = TokenCipher.encrypt_many(tokens)
+
+        cases = [
+            ('legacy xor encrypt', lambda: [_legacy_encrypt(t) for t in tokens]),
+            ('legacy xor decrypt', lambda: [_legacy_decrypt(c) for c in legacy_ciphertexts]),
+            ('cipher encrypt', lambda: [TokenCipher.encrypt(t) for t in tokens]),
+            ('cipher decrypt', lambda: [TokenCipher.decrypt(c) for c in ciphertexts]),
+            ('cipher encrypt_many', lambda: TokenCipher.encrypt_many(tokens)),
+            ('cipher decrypt_many', lambda: TokenCipher.decrypt_many(ciphertexts)),
+        ]
+
+        self.stdout.write(f"{len(tokens)} tokens of {options['length']} chars")
+        for name, run in cases:
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            per_token_us = elapsed / len(tokens) * 1e6
+            self.stdout.write(f"{name:<22} {elapsed * 1000:9.1f} ms  {per_token_us:7.2f} us/token")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from accounts.circuit import CircuitBreaker
+from accounts.models import SocialMediaAccount
+
+
+class Command(BaseCommand):
+    help = 'Show (or reset) the circuit breaker state shared by all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', metavar='PLATFORM', help='Close the circuit for a platform')
+        parser.add_argument('--endpoint', help='Endpoint to reset when circuits are per endpoint')
+
+    def handle(self, *args, **options):
+        breaker = CircuitBreaker.from_settings()
+
+        if options['reset']:
+            breaker.reset(options['reset'], options['endpoint'])
+            scope = breaker.scope(options['reset'], options['endpoint'])
+            self.stdout.write(self.style.SUCCESS(f"Circuit for {scope} closed"))
+            return
+
+        scopes = [platform for platform, _ in SocialMediaAccount.PLATFORM_CHOICES]
+        scopes += [scope for scope in breaker.tripped_scopes() if scope not in scopes]
+        for scope in scopes:
+            platform, _, endpoint = scope.partition(':')
+            status = breaker.status(platform, endpoint or None)
+            line = (
+                f"{scope:<32} {status['state']:<10} {status['calls']:>6} calls  "
+                f"{status['errors']:>6} errors  {status['slow']:>6} slow"
+            )
+            if status['retry_after']:
+                line += f"  retry in {status['retry_after']:.0f}s"
+            self.stdout.write(self.style.ERROR(line) if status['state'] != 'closed' else line)
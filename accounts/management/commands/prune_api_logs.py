@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from accounts.retention import APILogPruner, retention_settings
+
+
+class Command(BaseCommand):
+    help = 'Delete APICallLog rows (and fine-grained rollups) older than the retention window, in small chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Keep this many days of raw logs (default: API_LOG_RETENTION)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to yield the write lock between chunks')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        days = options['days'] if options['days'] is not None else retention_settings()['DAYS']
+        pruner = APILogPruner(
+            older_than=timedelta(days=days),
+            chunk_size=options['chunk_size'],
+            pause=options['pause'],
+        )
+
+        stats = pruner.run(progress=self._progress)
+        rate = stats['deleted'] / stats['elapsed'] if stats['elapsed'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {stats['deleted']} API log rows older than {days} days across {stats['accounts']} accounts "
+            f"in {stats['chunks']} chunks, {stats['rollups_deleted']} expired rollups, "
+            f"in {stats['elapsed']:.2f}s ({rate:,.0f} rows/s)"
+        ))
+
+    def _progress(self, stats):
+        if self.verbosity >= 2:
+            self.stdout.write(f"  {stats['deleted']} rows deleted in {stats['chunks']} chunks")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from accounts.session_sweeper import ExpiredSessionSweeper
+
+
+class Command(BaseCommand):
+    help = 'Delete expired OAuth session data and Django sessions, in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to yield the write lock between batches')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        sweeper = ExpiredSessionSweeper(batch_size=options['batch_size'], pause=options['pause'])
+
+        stats = sweeper.run(progress=self._progress)
+        deleted = stats['session_data'] + stats['django_sessions']
+        rate = deleted / stats['elapsed'] if stats['elapsed'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {stats['session_data']} expired OAuth sessions and {stats['django_sessions']} "
+            f"expired Django sessions in {stats['batches']} batches, "
+            f"in {stats['elapsed']:.2f}s ({rate:,.0f} rows/s)"
+        ))
+
+    def _progress(self, stats):
+        if self.verbosity >= 2:
+            self.stdout.write(f"  {stats['batches']} batches deleted")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-15 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='socialmediaaccount',
+            name='refresh_lease_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
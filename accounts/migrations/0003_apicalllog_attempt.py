@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-15 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_socialmediaaccount_refresh_lease_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apicalllog',
+            name='attempt',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-15 08:59
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_apicalllog_attempt'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apicalllog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-15 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_apicalllog_created_at_call_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apicalllog',
+            name='sample_weight',
+            field=models.FloatField(default=1.0),
+        ),
+    ]
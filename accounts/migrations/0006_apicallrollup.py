@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-15 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_apicalllog_sample_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APICallRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('platform', models.CharField(max_length=20)),
+                ('endpoint', models.CharField(max_length=200)),
+                ('status_class', models.CharField(max_length=3)),
+                ('count', models.FloatField(default=0)),
+                ('error_count', models.FloatField(default=0)),
+                ('total_response_time', models.FloatField(default=0)),
+                ('latency_histogram', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['platform', 'granularity', 'bucket_start'], name='accounts_ap_platfor_40d055_idx')],
+                'unique_together': {('granularity', 'bucket_start', 'platform', 'endpoint', 'status_class')},
+            },
+        ),
+    ]
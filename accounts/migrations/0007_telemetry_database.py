@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-15 09:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_apicallrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='apicalllog',
+            name='social_account',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='api_calls', to='accounts.socialmediaaccount'),
+        ),
+        migrations.AlterField(
+            model_name='apicalllog',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='api_calls', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
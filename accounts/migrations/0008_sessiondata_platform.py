@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-15 09:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_platform(apps, schema_editor):
+    """Copy temp_data['platform'] into the new column, one UPDATE per platform"""
+    SessionData = apps.get_model('accounts', 'SessionData')
+    sessions = SessionData.objects.using(schema_editor.connection.alias)
+    for platform in sessions.filter(platform='').values_list('temp_data__platform', flat=True).distinct():
+        if platform:
+            sessions.filter(platform='', temp_data__platform=platform).update(platform=platform)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_telemetry_database'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessiondata',
+            name='platform',
+            field=models.CharField(blank=True, choices=[('linkedin', 'LinkedIn'), ('twitter', 'Twitter'), ('facebook', 'Facebook'), ('instagram', 'Instagram')], max_length=20),
+        ),
+        migrations.RunPython(backfill_platform, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='sessiondata',
+            index=models.Index(fields=['user', 'platform'], name='accounts_se_user_id_3376ce_idx'),
+        ),
+    ]
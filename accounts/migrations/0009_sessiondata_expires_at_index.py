@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-15 09:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_sessiondata_platform'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sessiondata',
+            index=models.Index(fields=['expires_at'], name='accounts_se_expires_90eb74_idx'),
+        ),
+    ]
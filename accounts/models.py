@@ -1,7 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
-from cryptography.fernet import Fernet
 from django.conf import settings
 import json
 
@@ -58,6 +57,7 @@ class SocialMediaAccount(models.Model):
     refresh_token = models.TextField(blank=True, null=True)  # Encrypted refresh token
     token_expires_at = models.DateTimeField(blank=True, null=True)
     scope = models.TextField(blank=True)  # OAuth scopes granted
+    refresh_lease_until = models.DateTimeField(blank=True, null=True)  # Set while one worker refreshes the token
     
     # Account status and metadata
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
@@ -103,8 +103,11 @@ class SocialMediaAccount(models.Model):
 
 class APICallLog(models.Model):
     """Log API calls for monitoring and rate limiting"""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_calls')
-    social_account = models.ForeignKey(SocialMediaAccount, on_delete=models.CASCADE, related_name='api_calls')
+    # Stored in the telemetry database: no DB-level constraints, rows are removed explicitly (accounts/signals.py)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='api_calls')
+    social_account = models.ForeignKey(
+        SocialMediaAccount, on_delete=models.DO_NOTHING, db_constraint=False, related_name='api_calls',
+    )
     endpoint = models.CharField(max_length=200)
     method = models.CharField(max_length=10)
     status_code = models.IntegerField()
@@ -112,7 +115,9 @@ class APICallLog(models.Model):
     rate_limit_remaining = models.IntegerField(blank=True, null=True)
     rate_limit_reset = models.DateTimeField(blank=True, null=True)
     error_message = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    attempt = models.PositiveSmallIntegerField(default=1)  # 1 for the first try, >1 for retries
+    sample_weight = models.FloatField(default=1.0)  # Calls this row stands for when successes are sampled
+    created_at = models.DateTimeField(default=timezone.now, editable=False)  # Call time, not (buffered) insert time
 
     class Meta:
         indexes = [
@@ -125,6 +130,35 @@ class APICallLog(models.Model):
         return f"{self.social_account.platform} API call - {self.endpoint} ({self.status_code})"
 
 
+class APICallRollup(models.Model):
+    """Per-minute, hourly and daily API call aggregates with a fixed-bucket latency histogram"""
+    GRANULARITY_CHOICES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    platform = models.CharField(max_length=20)
+    endpoint = models.CharField(max_length=200)
+    status_class = models.CharField(max_length=3)  # '2xx', '3xx', '4xx', '5xx' or 'err' (no response)
+    count = models.FloatField(default=0)  # Weighted by APICallLog.sample_weight
+    error_count = models.FloatField(default=0)
+    total_response_time = models.FloatField(default=0)
+    latency_histogram = models.JSONField(default=list)  # Weighted counts per accounts.rollups.LATENCY_BUCKETS
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['granularity', 'bucket_start', 'platform', 'endpoint', 'status_class']
+        indexes = [
+            models.Index(fields=['platform', 'granularity', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f"{self.platform} {self.endpoint} {self.status_class} {self.granularity} @ {self.bucket_start}"
+
+
 class UserAnalytics(models.Model):
     """Store user analytics and engagement metrics"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='analytics')
@@ -173,6 +207,7 @@ class SessionData(models.Model):
     social_account = models.ForeignKey(SocialMediaAccount, on_delete=models.CASCADE, related_name='session_data', null=True, blank=True)
     
     # OAuth state and session information
+    platform = models.CharField(max_length=20, choices=SocialMediaAccount.PLATFORM_CHOICES, blank=True)
     oauth_state = models.CharField(max_length=255, blank=True)
     code_verifier = models.CharField(max_length=255, blank=True)  # For PKCE
     redirect_uri = models.URLField(blank=True)
@@ -190,6 +225,8 @@ class SessionData(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=['user', 'expires_at']),
+            models.Index(fields=['user', 'platform']),
+            models.Index(fields=['expires_at']),
             models.Index(fields=['oauth_state']),
         ]
 
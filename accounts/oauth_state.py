@@ -0,0 +1,136 @@
+"""
+OAuth login state that needs no SessionData row
+
+In the default 'database' mode every login writes a SessionData row and
+every callback reads it back and deletes it. The other two modes keep the
+OAuth round-trip off the database entirely:
+
+- 'signed': the state parameter itself carries the user id, platform and
+  PKCE code_verifier, signed and timestamped with SECRET_KEY (so it
+  expires after MAX_AGE). The verifier is AES-GCM encrypted inside it,
+  because the state is visible to the browser and the provider.
+- 'cache': the state is a random token naming a short-lived entry in the
+  CACHE alias, which the callback deletes. Point that alias at a cache all
+  workers share.
+
+A signed state stays valid until it expires. Replaying one is harmless,
+because it only works for the user it was issued to, and the provider
+accepts each authorization code once.
+"""
+import secrets
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+from accounts.crypto import TokenCipher
+
+DEFAULT_OAUTH_STATE_SETTINGS = {
+    'MODE': 'database',  # 'database' (SessionData rows), 'signed' or 'cache'
+    'MAX_AGE': 1800,  # Seconds a login may take before its state expires
+    'CACHE': 'default',  # Cache alias for 'cache' mode
+}
+
+SIGNING_SALT = 'accounts.oauth-state'
+CACHE_KEY_PREFIX = 'oauth-state:'
+
+
+def oauth_state_settings():
+    """DEFAULT_OAUTH_STATE_SETTINGS overridden by settings.OAUTH_STATE"""
+    return {**DEFAULT_OAUTH_STATE_SETTINGS, **getattr(settings, 'OAUTH_STATE', {})}
+
+
+class OAuthState:
+    """The parts of a SessionData row an OAuth callback uses, without the row"""
+
+    def __init__(self, oauth_state, user_id, platform, code_verifier='', cache_key=None, cache_alias=None):
+        self.oauth_state = oauth_state
+        self.user_id = user_id
+        self.platform = platform
+        self.code_verifier = code_verifier
+        self._cache_key = cache_key
+        self._cache_alias = cache_alias
+
+    def __repr__(self):
+        return f"<OAuthState {self.platform} user={self.user_id}>"
+
+    def delete(self):
+        """Forget the state; signed states have nothing stored to delete"""
+        if self._cache_key:
+            caches[self._cache_alias].delete(self._cache_key)
+
+
+class SignedStateStore:
+    """Carry the whole login state in the signed state parameter"""
+
+    def __init__(self, max_age=1800):
+        self.max_age = max_age
+
+    def issue(self, user, platform, code_verifier=None):
+        payload = {
+            'u': user.pk,
+            'p': platform,
+            'v': TokenCipher.encrypt(code_verifier or ''),
+            'n': secrets.token_urlsafe(8),  # Two logins in the same second still get distinct states
+        }
+        state = signing.dumps(payload, salt=SIGNING_SALT, compress=True)
+        return OAuthState(state, user.pk, platform, code_verifier or '')
+
+    def load(self, state):
+        try:
+            payload = signing.loads(state, salt=SIGNING_SALT, max_age=self.max_age)
+        except signing.BadSignature:  # Includes SignatureExpired
+            return None
+        return OAuthState(state, payload['u'], payload['p'], TokenCipher.decrypt(payload['v']))
+
+    def consume(self, state, user_id=None):
+        # Nothing is stored, so a signed state cannot be spent; see the module docstring
+        loaded = self.load(state)
+        if loaded is None or (user_id is not None and loaded.user_id != user_id):
+            return None
+        return loaded
+
+
+class CacheStateStore:
+    """Keep the login state in a cache entry named by a random state token"""
+
+    def __init__(self, cache_alias='default', max_age=1800):
+        self.cache_alias = cache_alias
+        self.max_age = max_age
+
+    def issue(self, user, platform, code_verifier=None):
+        state = secrets.token_urlsafe(32)
+        entry = {'user_id': user.pk, 'platform': platform, 'code_verifier': TokenCipher.encrypt(code_verifier or '')}
+        caches[self.cache_alias].set(CACHE_KEY_PREFIX + state, entry, self.max_age)
+        return self._state(state, entry)
+
+    def load(self, state):
+        entry = caches[self.cache_alias].get(CACHE_KEY_PREFIX + state)
+        if entry is None:
+            return None
+        return self._state(state, entry)
+
+    def consume(self, state, user_id=None):
+        loaded = self.load(state)
+        if loaded is None or (user_id is not None and loaded.user_id != user_id):
+            return None
+        # Of two concurrent callbacks only the one whose delete removed the entry proceeds
+        if not caches[self.cache_alias].delete(loaded._cache_key):
+            return None
+        return loaded
+
+    def _state(self, state, entry):
+        return OAuthState(
+            state, entry['user_id'], entry['platform'], TokenCipher.decrypt(entry['code_verifier']),
+            cache_key=CACHE_KEY_PREFIX + state, cache_alias=self.cache_alias,
+        )
+
+
+def stateless_store():
+    """The configured stateless store, or None in 'database' mode"""
+    config = oauth_state_settings()
+    if config['MODE'] == 'signed':
+        return SignedStateStore(max_age=config['MAX_AGE'])
+    if config['MODE'] == 'cache':
+        return CacheStateStore(cache_alias=config['CACHE'], max_age=config['MAX_AGE'])
+    return None
@@ -0,0 +1,115 @@
+"""
+Streaming pagination over platform list endpoints
+
+iter_pages() and iter_items() walk followers, tweets, posts and other list
+endpoints one page at a time, so memory stays at two pages however long
+the list is. The next page is fetched on a background thread while the
+caller works through the current one. Every Page carries the cursor that
+fetched it and the cursor of the page after it; save ``page.next_cursor``
+once a page is processed and pass it back as ``cursor=`` to resume.
+"""
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PaginationError(Exception):
+    """A page could not be fetched; ``cursor`` is where to resume from"""
+
+    def __init__(self, endpoint, cursor, status_code):
+        self.endpoint = endpoint
+        self.cursor = cursor
+        self.status_code = status_code
+        super().__init__(f"Fetching {endpoint} at cursor {cursor!r} failed with status {status_code}")
+
+
+class Page:
+    """One page of results plus the cursors on either side of it"""
+
+    def __init__(self, items, cursor, next_cursor):
+        self.items = items
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+
+    def __repr__(self):
+        return f"<Page {len(self.items)} items cursor={self.cursor!r} next={self.next_cursor!r}>"
+
+
+class TwitterPaging:
+    """Twitter API v2: meta.next_token is sent back as pagination_token"""
+
+    def params(self, params, cursor, page_size):
+        params = dict(params or {})
+        if page_size:
+            params['max_results'] = page_size
+        if cursor:
+            params['pagination_token'] = cursor
+        return params
+
+    def parse(self, payload, params):
+        return payload.get('data') or [], (payload.get('meta') or {}).get('next_token')
+
+
+class LinkedInPaging:
+    """LinkedIn v2: start/count offsets; a short page or paging.total ends the list"""
+
+    DEFAULT_COUNT = 50
+
+    def params(self, params, cursor, page_size):
+        params = dict(params or {})
+        params['start'] = cursor or 0
+        params['count'] = page_size or params.get('count', self.DEFAULT_COUNT)
+        return params
+
+    def parse(self, payload, params):
+        elements = payload.get('elements') or []
+        next_start = params['start'] + len(elements)
+        total = (payload.get('paging') or {}).get('total')
+        if len(elements) < params['count'] or (total is not None and next_start >= total):
+            return elements, None
+        return elements, next_start
+
+
+PAGING_STYLES = {
+    'twitter': TwitterPaging,
+    'linkedin': LinkedInPaging,
+}
+
+
+def iter_pages(client, endpoint, params=None, cursor=None, page_size=None, prefetch=True):
+    """Yield Page objects for a list endpoint, starting at cursor (None for the first page)"""
+    platform = client.social_account.platform
+    if platform not in PAGING_STYLES:
+        raise ValueError(f"Pagination is not supported for platform: {platform}")
+    paging = PAGING_STYLES[platform]()
+
+    # Prefetches run on another thread, so they get their own last_status_code
+    fetcher = copy.copy(client)
+
+    def fetch(page_cursor):
+        request_params = paging.params(params, page_cursor, page_size)
+        payload = fetcher.make_request(endpoint, params=request_params)
+        if payload is None:
+            raise PaginationError(endpoint, page_cursor, fetcher.last_status_code)
+        items, next_cursor = paging.parse(payload, request_params)
+        return Page(items, page_cursor, next_cursor)
+
+    if not prefetch:
+        while True:
+            page = fetch(cursor)
+            yield page
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = executor.submit(fetch, cursor)
+        while pending is not None:
+            page = pending.result()
+            pending = executor.submit(fetch, page.next_cursor) if page.next_cursor is not None else None
+            yield page
+
+
+def iter_items(client, endpoint, params=None, cursor=None, page_size=None, prefetch=True):
+    """Yield individual items across all pages of a list endpoint"""
+    for page in iter_pages(client, endpoint, params, cursor, page_size, prefetch):
+        yield from page.items
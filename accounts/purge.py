@@ -0,0 +1,99 @@
+"""
+Chunked deletion of everything that belongs to a social account
+
+Deleting through the ORM makes the collector load every child row (tweets,
+followers, logs...) before cascading, and one DELETE over millions of rows
+holds SQLite's write lock for as long as it runs. AccountPurger instead
+walks each child table in primary-key order through its social_account
+index. It deletes at most chunk_size rows per raw DELETE, each in its own
+transaction on the table's database (APICallLog lives in the telemetry
+one), and counts deletions from the DELETEs' row counts, so no separate
+counting pass is needed.
+
+Only CASCADE relations are purged this way, plus DO_NOTHING ones such as
+APICallLog's, whose rows live in another database and would otherwise be
+orphaned. Rows behind SET_NULL, PROTECT and other on_delete rules are left
+for the ORM's final delete of the account to handle.
+"""
+import time
+
+from django.db import connections, models, router, transaction
+
+from accounts.models import SocialMediaAccount
+
+PURGED_ON_DELETE = (models.CASCADE, models.DO_NOTHING)
+
+
+class AccountPurger:
+    """Delete a social account's dependent rows in bounded, pk-ranged chunks"""
+
+    def __init__(self, chunk_size=2000, pause=0):
+        self.chunk_size = chunk_size
+        self.pause = pause
+
+    @staticmethod
+    def dependent_fields():
+        """(model, foreign key field) for every table whose rows go with a deleted SocialMediaAccount"""
+        return [
+            (relation.related_model, relation.field)
+            for relation in SocialMediaAccount._meta.related_objects
+            if relation.field.concrete and relation.field.remote_field.on_delete in PURGED_ON_DELETE
+        ]
+
+    def purge(self, social_account, progress=None):
+        """Delete all dependent rows (not the account itself) and return deletion statistics"""
+        stats = {'deleted': {}, 'chunks': 0, 'elapsed': 0.0}
+        start = time.perf_counter()
+        for model, field in self.dependent_fields():
+            deleted = self._purge_table(model, field, social_account.pk, stats)
+            if deleted:
+                stats['deleted'][model._meta.label] = deleted
+            if progress:
+                progress(stats)
+        stats['elapsed'] = time.perf_counter() - start
+        return stats
+
+    def _purge_table(self, model, field, account_id, stats):
+        opts = model._meta
+        if opts.related_objects:
+            # Something points at these rows, so let the collector cascade each chunk
+            return self._purge_with_collector(model, field, account_id, stats)
+
+        connection = connections[router.db_for_write(model)]
+        qn = connection.ops.quote_name
+        table, pk, fk = qn(opts.db_table), qn(opts.pk.column), qn(field.column)
+        # The row chunk_size rows past the last deleted one; its pk closes the next range
+        boundary_sql = f"SELECT {pk} FROM {table} WHERE {fk} = %s AND {pk} > %s ORDER BY {pk} LIMIT 1 OFFSET %s"
+        delete_sql = f"DELETE FROM {table} WHERE {fk} = %s AND {pk} > %s"
+
+        deleted = 0
+        last_pk = -1  # Below any auto-increment pk (every dependent model uses one)
+        while True:
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute(boundary_sql, [account_id, last_pk, self.chunk_size - 1])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(delete_sql, [account_id, last_pk])
+                else:
+                    cursor.execute(f"{delete_sql} AND {pk} <= %s", [account_id, last_pk, row[0]])
+                chunk = cursor.rowcount
+            deleted += chunk
+            stats['chunks'] += 1 if chunk else 0
+            if row is None:
+                return deleted
+            last_pk = row[0]
+            if self.pause:
+                time.sleep(self.pause)
+
+    def _purge_with_collector(self, model, field, account_id, stats):
+        deleted = 0
+        keys = model._default_manager.filter(**{field.attname: account_id}).order_by('pk').values_list('pk', flat=True)
+        while True:
+            ids = list(keys[:self.chunk_size])
+            if not ids:
+                return deleted
+            with transaction.atomic(using=router.db_for_write(model)):
+                deleted += model._default_manager.filter(pk__in=ids).delete()[1].get(model._meta.label, 0)
+            stats['chunks'] += 1
+            if self.pause:
+                time.sleep(self.pause)
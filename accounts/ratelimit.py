@@ -0,0 +1,171 @@
+"""
+Client-side rate limiting driven by platform rate-limit headers
+
+Each (account, endpoint template) pair gets a budget mirrored from the last
+``x-rate-limit-remaining`` / ``x-rate-limit-reset`` headers the platform
+sent. Budgets live in the cache named by settings.RATE_LIMIT_CACHE so
+every worker process draws from the same pool; after a cache flush or a
+restart they are rebuilt from the newest APICallLog row.
+
+Calls are counted against the budget with the cache's incr(), which is
+atomic on Redis, Memcached and the local-memory cache. It is not atomic on
+DatabaseCache or FileBasedCache, so the limiter warns about those. If the
+cache fails, the limiter fails open and lets the call through.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+from accounts.models import APICallLog
+
+# How long to remember that nothing is known about an endpoint's budget
+UNKNOWN_BUDGET_TTL = 60
+
+# Path segments that are ids rather than part of the route: numbers and LinkedIn URNs
+_ID_SEGMENT = re.compile(r'^(\d+|urn:.+)$')
+# Routes whose parameters are not id-shaped
+_NAMED_ROUTES = (
+    (re.compile(r'^users/by/username/[^/]+'), 'users/by/username/:username'),
+)
+
+# Regex for each template parameter, to find logged calls that share a route
+_PARAM_PATTERNS = {':id': r'(\d+|urn:[^/]+)', ':username': r'[^/]+'}
+
+_warned_caches = set()
+
+
+def endpoint_template(endpoint):
+    """The route an endpoint belongs to, e.g. 'tweets/:id' for 'tweets/123?expansions=x'"""
+    path = endpoint.split('?', 1)[0].strip('/')
+    for pattern, template in _NAMED_ROUTES:
+        if pattern.match(path):
+            return pattern.sub(template, path)
+    return '/'.join(':id' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/'))
+
+
+def endpoint_pattern(endpoint):
+    """Regex matching every raw endpoint with the same template, e.g. 'tweets/1' and '/tweets/2?x=y'"""
+    segments = (_PARAM_PATTERNS.get(segment) or re.escape(segment) for segment in endpoint_template(endpoint).split('/'))
+    return r'^/?' + '/'.join(segments) + r'/?(\?.*)?$'
+
+
+def warn_if_not_atomic(alias, cache):
+    """Warn once per alias about caches whose incr() is a get followed by a set"""
+    if isinstance(cache, (DatabaseCache, FileBasedCache)) and alias not in _warned_caches:
+        _warned_caches.add(alias)
+        print(f"⚠️ Cache '{alias}' has no atomic incr(); counters shared across workers will drift")
+
+
+class RateLimitExceeded(Exception):
+    """Raised instead of sending a call that would exceed the platform budget"""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit budget exhausted, resets in {retry_after:.0f}s")
+
+
+def parse_rate_limit_headers(platform, headers):
+    """Return (remaining, reset epoch seconds) from a platform response, or Nones"""
+    if platform != 'twitter':
+        return None, None
+
+    remaining = headers.get('x-rate-limit-remaining')
+    reset = headers.get('x-rate-limit-reset')
+    try:
+        remaining = int(remaining) if remaining is not None else None
+        reset = int(reset) if reset is not None else None
+    except ValueError:
+        return None, None
+    return remaining, reset
+
+
+class RateLimiter:
+    """Per-account, per-endpoint token bucket refilled at the platform's reset time"""
+
+    def __init__(self, cache_alias=None, max_wait=None):
+        alias = cache_alias or getattr(settings, 'RATE_LIMIT_CACHE', 'default')
+        self.cache = caches[alias]
+        self.max_wait = max_wait if max_wait is not None else getattr(settings, 'RATE_LIMIT_MAX_WAIT', 5.0)
+        warn_if_not_atomic(alias, self.cache)
+
+    @staticmethod
+    def _keys(social_account, endpoint):
+        digest = hashlib.blake2b(endpoint_template(endpoint).encode(), digest_size=8).hexdigest()
+        prefix = f"ratelimit:{social_account.id}:{digest}"
+        return f"{prefix}:reset", f"{prefix}:remaining", f"{prefix}:used"
+
+    def record(self, social_account, endpoint, headers):
+        """Refill the bucket from a response's rate-limit headers"""
+        remaining, reset = parse_rate_limit_headers(social_account.platform, headers)
+        if remaining is None or reset is None:
+            return
+        try:
+            self._store(social_account, endpoint, remaining, reset)
+        except Exception as e:  # Cache backends raise their own error types
+            print(f"⚠️ Could not record rate-limit budget: {e}")
+
+    def reserve(self, social_account, endpoint):
+        """Take one call from the budget; return 0, or seconds to wait (callers give up past max_wait)"""
+        try:
+            return self._reserve(social_account, endpoint)
+        except Exception as e:  # Cache backends raise their own error types
+            # Without the budget the platform's own 429 is the backstop
+            print(f"⚠️ Rate-limit budget unavailable, sending anyway: {e}")
+            return 0
+
+    def _reserve(self, social_account, endpoint):
+        reset_key, remaining_key, used_key = self._keys(social_account, endpoint)
+        values = self.cache.get_many([reset_key, remaining_key])
+        if reset_key not in values:
+            values = self._rebuild(social_account, endpoint)
+
+        now = time.time()
+        reset = values.get(reset_key) or 0
+        if reset <= now:
+            return 0
+        remaining = values.get(remaining_key, 0)
+        if remaining <= 0:
+            return reset - now
+
+        # incr() is atomic, so concurrent workers each get a distinct slot number
+        self.cache.add(used_key, 0, timeout=max(1, int(reset - now) + 5))
+        try:
+            used = self.cache.incr(used_key)
+        except ValueError:
+            # Expired between add() and incr(): the window has just reset
+            return 0
+        if used > remaining:
+            # Other workers took the last calls of this window
+            return reset - now
+        return 0
+
+    def _store(self, social_account, endpoint, remaining, reset):
+        reset_key, remaining_key, used_key = self._keys(social_account, endpoint)
+        timeout = max(1, int(reset - time.time()) + 5)
+        # The headers already count every call the platform has seen, so start counting afresh
+        self.cache.set_many({reset_key: reset, remaining_key: remaining, used_key: 0}, timeout=timeout)
+        return {reset_key: reset, remaining_key: remaining}
+
+    def _rebuild(self, social_account, endpoint):
+        """Seed the bucket from the newest logged headers for the route (served by the account/created_at index)"""
+        latest = (
+            APICallLog.objects
+            .filter(social_account_id=social_account.id, rate_limit_remaining__isnull=False)
+            .filter(endpoint__regex=endpoint_pattern(endpoint))
+            .order_by('-created_at')
+            .values('rate_limit_remaining', 'rate_limit_reset')
+            .first()
+        )
+        if latest and latest['rate_limit_reset'] and latest['rate_limit_reset'].timestamp() > time.time():
+            return self._store(
+                social_account, endpoint, latest['rate_limit_remaining'], int(latest['rate_limit_reset'].timestamp()),
+            )
+
+        reset_key = self._keys(social_account, endpoint)[0]
+        self.cache.set(reset_key, 0, timeout=UNKNOWN_BUDGET_TTL)
+        return {reset_key: 0}
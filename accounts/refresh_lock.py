@@ -0,0 +1,64 @@
+"""
+Single-flight coordination for OAuth token refreshes
+
+Two layers make sure only one refresh runs per account: an in-process lock
+map serialises threads, and a lease column on SocialMediaAccount (claimed
+with a conditional UPDATE, which SQLite executes atomically) serialises
+worker processes.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts import transport
+from accounts.models import SocialMediaAccount
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+@contextmanager
+def local_refresh_lock(account_id):
+    """Hold the in-process refresh lock for an account"""
+    with _locks_guard:
+        entry = _locks.get(account_id)
+        if entry is None:
+            entry = _locks[account_id] = [threading.Lock(), 0]
+        entry[1] += 1
+
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _locks[account_id]
+
+
+def lease_duration():
+    """Configured lease, stretched to outlast one refresh request hitting its timeouts"""
+    worst_case_refresh = sum(transport.default_timeout()) + 5
+    return timedelta(seconds=max(getattr(settings, 'TOKEN_REFRESH_LEASE_SECONDS', 30), worst_case_refresh))
+
+
+def acquire_refresh_lease(account_id, now=None):
+    """Claim the cross-process refresh lease; return its expiry if this caller now holds it, else None"""
+    now = now or timezone.now()
+    lease = now + lease_duration()
+    claimed = (
+        SocialMediaAccount.objects
+        .filter(pk=account_id)
+        .filter(Q(refresh_lease_until__isnull=True) | Q(refresh_lease_until__lte=now))
+        .update(refresh_lease_until=lease)
+    )
+    return lease if claimed == 1 else None
+
+
+def release_refresh_lease(account_id, lease):
+    """Release a lease this caller still holds; a lapsed lease someone else re-claimed is left alone"""
+    SocialMediaAccount.objects.filter(pk=account_id, refresh_lease_until=lease).update(refresh_lease_until=None)
@@ -0,0 +1,258 @@
+"""
+Response cache for APIClient GET requests
+
+Responses are keyed by account, endpoint and params and kept fresh for a
+per-endpoint TTL (settings.API_RESPONSE_CACHE['TTLS']). Once stale, an
+entry that carried an ETag or Last-Modified validator is revalidated with
+a conditional request, so an unchanged resource costs a 304 instead of a
+full download. Storage is pluggable: process memory, a directory of files,
+or any Django cache alias. Entries are stored as JSON text, so every lookup
+decodes a private copy and callers may mutate what they get back.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import caches
+
+DEFAULT_RESPONSE_CACHE_SETTINGS = {
+    'BACKEND': 'locmem',  # 'locmem', 'file' or 'django'
+    'LOCATION': '',  # Directory for 'file', cache alias for 'django'
+    'MAX_ENTRIES': 1000,
+    'STALE_TTL': 24 * 3600,  # How long stale entries with validators are kept for revalidation
+    'TTLS': {  # '<platform>:<endpoint>' -> seconds; endpoints not listed are never cached
+        'twitter:users/me': 300,
+        'linkedin:userinfo': 300,
+    },
+}
+
+
+class CachedResponse:
+    """A cached JSON body plus the validators needed to revalidate it"""
+
+    def __init__(self, data, fresh_until, etag=None, last_modified=None):
+        self.data = data
+        self.fresh_until = fresh_until
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def is_fresh(self):
+        return time.time() < self.fresh_until
+
+    def has_validators(self):
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_json(self):
+        return json.dumps([self.data, self.fresh_until, self.etag, self.last_modified])
+
+    @classmethod
+    def from_json(cls, raw):
+        data, fresh_until, etag, last_modified = json.loads(raw)
+        return cls(data, fresh_until, etag=etag, last_modified=last_modified)
+
+
+class LocMemBackend:
+    """Per-process LRU bounded by entry count"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if time.time() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, timeout):
+        with self._lock:
+            self._entries[key] = (entry, time.time() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileBackend:
+    """One JSON file per entry in a private directory, shared by processes on one host
+
+    The directory is created 0o700 and refused if another user owns it or
+    can write to it, since anyone who can plant files there can forge
+    cached API responses.
+    """
+
+    def __init__(self, directory, max_entries=1000):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._check_private(directory)
+
+    @staticmethod
+    def _check_private(directory):
+        if not hasattr(os, 'getuid'):
+            return
+        info = os.stat(directory)
+        if info.st_uid != os.getuid() or info.st_mode & 0o022:
+            raise ImproperlyConfigured(
+                f"Response cache directory {directory} must be owned by this user and not writable by others"
+            )
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.cache")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry, expires_at = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() >= expires_at:
+            self._remove(self._path(key))
+            return None
+        return entry
+
+    def set(self, key, entry, timeout):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump([entry, time.time() + timeout], f)
+        os.replace(tmp_path, self._path(key))
+        self._cull()
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.cache'):
+                self._remove(os.path.join(self.directory, name))
+
+    def _cull(self):
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.cache')]
+        if len(paths) <= self.max_entries:
+            return
+        # Evict the least recently written tenth so culling is not paid on every set
+        paths.sort(key=lambda path: os.stat(path).st_mtime if os.path.exists(path) else 0)
+        for path in paths[:len(paths) - self.max_entries + self.max_entries // 10]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class DjangoCacheBackend:
+    """Delegate to a Django cache alias; its own MAX_ENTRIES bounds the size"""
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(f"api-response:{key}")
+
+    def set(self, key, entry, timeout):
+        self.cache.set(f"api-response:{key}", entry, timeout=timeout)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class ResponseCache:
+    """Per-endpoint TTL cache with conditional revalidation and hit/miss counters"""
+
+    def __init__(self, backend, ttls=None, stale_ttl=24 * 3600):
+        self.backend = backend
+        self.ttls = ttls or {}
+        self.stale_ttl = stale_ttl
+        self._stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stored': 0}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """Build the cache from DEFAULT_RESPONSE_CACHE_SETTINGS overridden by settings.API_RESPONSE_CACHE"""
+        config = {**DEFAULT_RESPONSE_CACHE_SETTINGS, **getattr(settings, 'API_RESPONSE_CACHE', {})}
+        if config['BACKEND'] == 'file':
+            location = config['LOCATION'] or os.path.join(tempfile.gettempdir(), 'connectly-api-cache')
+            backend = FileBackend(location, max_entries=config['MAX_ENTRIES'])
+        elif config['BACKEND'] == 'django':
+            backend = DjangoCacheBackend(config['LOCATION'] or 'default')
+        else:
+            backend = LocMemBackend(max_entries=config['MAX_ENTRIES'])
+        return cls(backend, ttls=config['TTLS'], stale_ttl=config['STALE_TTL'])
+
+    def ttl_for(self, platform, endpoint):
+        """Freshness lifetime for an endpoint; 0 means the endpoint is not cached"""
+        return self.ttls.get(f"{platform}:{endpoint.lstrip('/')}", 0)
+
+    @staticmethod
+    def make_key(social_account, endpoint, params):
+        params = {key: value for key, value in (params or {}).items() if key != 'access_token'}
+        raw = json.dumps([social_account.id, endpoint.lstrip('/'), params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached entry (fresh or stale-but-revalidatable) and count the lookup"""
+        raw = self.backend.get(key)
+        entry = CachedResponse.from_json(raw) if raw is not None else None
+        self._count('hits' if entry is not None and entry.is_fresh() else 'misses')
+        return entry
+
+    def store(self, key, data, headers, ttl):
+        entry = CachedResponse(
+            data,
+            fresh_until=time.time() + ttl,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+        )
+        self.backend.set(key, entry.to_json(), self._storage_timeout(entry, ttl))
+        self._count('stored')
+        return entry
+
+    def revalidated(self, key, entry, headers, ttl):
+        """Extend a stale entry after the platform answered 304 Not Modified"""
+        entry.fresh_until = time.time() + ttl
+        entry.etag = headers.get('ETag') or entry.etag
+        entry.last_modified = headers.get('Last-Modified') or entry.last_modified
+        self.backend.set(key, entry.to_json(), self._storage_timeout(entry, ttl))
+        self._count('revalidated')
+        return entry
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def clear(self):
+        self.backend.clear()
+
+    def _storage_timeout(self, entry, ttl):
+        return ttl + self.stale_ttl if entry.has_validators() else ttl
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+
+response_cache = ResponseCache.from_settings()
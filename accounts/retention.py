@@ -0,0 +1,84 @@
+"""
+Retention pruning for APICallLog and its rollups
+
+The pruner walks one account at a time through the (social_account,
+created_at) index and deletes its expired rows with delete_in_chunks(), so
+request traffic can take SQLite's write lock between chunks.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from accounts.chunked import delete_in_chunks
+from accounts.models import APICallLog, APICallRollup
+
+DEFAULT_RETENTION_SETTINGS = {
+    'DAYS': 30,  # Raw APICallLog rows
+    'MINUTE_ROLLUP_DAYS': 7,
+    'HOUR_ROLLUP_DAYS': 90,  # Daily rollups are kept indefinitely
+}
+
+
+def retention_settings():
+    """DEFAULT_RETENTION_SETTINGS overridden by settings.API_LOG_RETENTION"""
+    return {**DEFAULT_RETENTION_SETTINGS, **getattr(settings, 'API_LOG_RETENTION', {})}
+
+
+class APILogPruner:
+    """Delete expired API log rows in small, index-driven chunks"""
+
+    def __init__(self, older_than=None, chunk_size=1000, pause=0.05, rollup_retention=None):
+        config = retention_settings()
+        self.older_than = older_than or timedelta(days=config['DAYS'])
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.rollup_retention = rollup_retention if rollup_retention is not None else {
+            'minute': timedelta(days=config['MINUTE_ROLLUP_DAYS']),
+            'hour': timedelta(days=config['HOUR_ROLLUP_DAYS']),
+        }
+
+    def run(self, now=None, progress=None):
+        """Prune everything past retention and return deletion statistics"""
+        now = now or timezone.now()
+        cutoff = now - self.older_than
+        stats = {'deleted': 0, 'chunks': 0, 'accounts': 0, 'rollups_deleted': 0, 'elapsed': 0.0}
+        start = time.perf_counter()
+
+        account_ids = (
+            APICallLog.objects.filter(created_at__lt=cutoff)
+            .order_by('social_account_id').values_list('social_account_id', flat=True).distinct()
+        )
+        for account_id in list(account_ids):
+            stats['accounts'] += 1
+            self._prune_account(account_id, cutoff, stats, progress)
+
+        for granularity, keep_for in self.rollup_retention.items():
+            stats['rollups_deleted'] += self._prune_rollups(granularity, now - keep_for)
+
+        stats['elapsed'] = time.perf_counter() - start
+        return stats
+
+    def _prune_account(self, account_id, cutoff, stats, progress):
+        expired = (
+            APICallLog.objects
+            .filter(social_account_id=account_id, created_at__lt=cutoff)
+            .order_by('created_at')
+        )
+
+        def counted(deleted):
+            stats['deleted'] += deleted
+            stats['chunks'] += 1
+            if progress:
+                progress(stats)
+
+        delete_in_chunks(expired, self.chunk_size, self.pause, on_chunk=counted)
+
+    def _prune_rollups(self, granularity, cutoff):
+        expired = (
+            APICallRollup.objects
+            .filter(granularity=granularity, bucket_start__lt=cutoff)
+            .order_by('bucket_start')
+        )
+        return delete_in_chunks(expired, self.chunk_size, self.pause)
@@ -0,0 +1,94 @@
+"""
+Retry policy for outbound platform calls
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+
+DEFAULT_RETRY_SETTINGS = {
+    'MAX_ATTEMPTS': 4,
+    'BASE_DELAY': 0.5,  # Seconds before the first retry, doubled each attempt
+    'MAX_DELAY': 30.0,  # Cap on a single backoff sleep
+    'TOTAL_BUDGET': 60.0,  # Cap on the time one call may spend, sleeps included
+}
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter that honours platform rate-limit hints"""
+
+    IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+    # 0 stands for a connection error or timeout (no response at all)
+    RETRYABLE_STATUS_CODES = frozenset({0, 408, 429, 500, 502, 503, 504})
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=30.0, total_budget=60.0, random_func=random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.total_budget = total_budget
+        self.random_func = random_func
+
+    @classmethod
+    def from_settings(cls):
+        """Build the policy from DEFAULT_RETRY_SETTINGS overridden by settings.API_RETRY_POLICY"""
+        config = {**DEFAULT_RETRY_SETTINGS, **getattr(settings, 'API_RETRY_POLICY', {})}
+        return cls(
+            max_attempts=config['MAX_ATTEMPTS'],
+            base_delay=config['BASE_DELAY'],
+            max_delay=config['MAX_DELAY'],
+            total_budget=config['TOTAL_BUDGET'],
+        )
+
+    def deadline(self):
+        """Monotonic time after which no further attempt may start"""
+        return time.monotonic() + self.total_budget
+
+    def is_retryable(self, method, status_code):
+        return method.upper() in self.IDEMPOTENT_METHODS and status_code in self.RETRYABLE_STATUS_CODES
+
+    def next_delay(self, attempt, status_code, headers, deadline):
+        """Seconds to sleep before the next attempt, or None to give up"""
+        if attempt >= self.max_attempts:
+            return None
+
+        delay = self._rate_limit_delay(status_code, headers)
+        if delay is None:
+            backoff = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+            delay = self.random_func() * backoff
+
+        if time.monotonic() + delay > deadline:
+            return None
+        return delay
+
+    @staticmethod
+    def describe(error_message, attempt, delay, retryable):
+        """Annotate a logged error with the retry decision taken for it"""
+        if delay is not None:
+            return f"Retrying in {delay:.2f}s after attempt {attempt}: {error_message}"
+        if retryable:
+            return f"Gave up after {attempt} attempts: {error_message}"
+        return error_message
+
+    @staticmethod
+    def _rate_limit_delay(status_code, headers):
+        """Delay requested by the platform via Retry-After or x-rate-limit-reset"""
+        retry_after = headers.get('Retry-After')
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+
+        # Twitter sends the epoch second at which the window resets
+        reset = headers.get('x-rate-limit-reset')
+        if status_code == 429 and reset:
+            try:
+                return max(0.0, int(reset) - time.time())
+            except ValueError:
+                pass
+        return None
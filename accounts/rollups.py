@@ -0,0 +1,186 @@
+"""
+Latency and error rollups maintained from the APICallLog stream
+
+Each batch of log rows that the log sink writes is folded into
+APICallRollup rows in the same transaction. There is one row per minute,
+hour and day bucket for each platform, endpoint template (so 'tweets/123'
+and 'tweets/456' share 'tweets/:id', as in the rate limiter) and status
+class. A row
+holds a weighted call count, an error count and a latency histogram over
+the fixed LATENCY_BUCKETS. latency_percentiles() answers questions like
+"p95 for twitter users/me this week" from rollups alone. It covers the
+range with the coarsest buckets that fit and uses minute buckets only at
+the ragged ends.
+"""
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import router, transaction
+from django.db.models import Q
+
+from accounts.models import APICallRollup
+from accounts.ratelimit import endpoint_template
+
+# Upper edges (seconds) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+GRANULARITIES = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+
+def status_class(status_code):
+    if not status_code:
+        return 'err'
+    return f"{min(status_code // 100, 5)}xx"
+
+
+def bucket_index(response_time):
+    for index, upper in enumerate(LATENCY_BUCKETS):
+        if response_time <= upper:
+            return index
+    return len(LATENCY_BUCKETS)
+
+
+def truncate(moment, granularity):
+    """Start of the (UTC) minute, hour or day bucket containing moment"""
+    moment = moment.astimezone(dt_timezone.utc)
+    if granularity == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _empty_histogram():
+    return [0.0] * (len(LATENCY_BUCKETS) + 1)
+
+
+def record_calls(logs, using=None):
+    """Fold saved APICallLog rows into their minute, hour and day rollups"""
+    deltas = defaultdict(lambda: {'count': 0.0, 'error_count': 0.0, 'total_response_time': 0.0,
+                                  'latency_histogram': _empty_histogram()})
+    for log in logs:
+        weight = log.sample_weight
+        status = status_class(log.status_code)
+        for granularity in GRANULARITIES:
+            key = (granularity, truncate(log.created_at, granularity), log.social_account.platform,
+                   endpoint_template(log.endpoint), status)
+            delta = deltas[key]
+            delta['count'] += weight
+            if log.status_code not in (200, 304):
+                delta['error_count'] += weight
+            delta['total_response_time'] += log.response_time * weight
+            delta['latency_histogram'][bucket_index(log.response_time)] += weight
+    if not deltas:
+        return 0
+
+    using = using or router.db_for_write(APICallRollup)
+    with transaction.atomic(using=using):
+        # Lock the rows being added to (a no-op on SQLite, whose write lock the log insert already took)
+        candidates = APICallRollup.objects.using(using).select_for_update().filter(
+            bucket_start__in={key[1] for key in deltas},
+            platform__in={key[2] for key in deltas},
+            endpoint__in={key[3] for key in deltas},
+        )
+        existing = {
+            (row.granularity, row.bucket_start, row.platform, row.endpoint, row.status_class): row
+            for row in candidates
+        }
+
+        to_update, to_create = [], []
+        for key, delta in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                granularity, bucket_start, platform, endpoint, status = key
+                to_create.append(APICallRollup(
+                    granularity=granularity, bucket_start=bucket_start, platform=platform,
+                    endpoint=endpoint, status_class=status, **delta,
+                ))
+                continue
+            row.count += delta['count']
+            row.error_count += delta['error_count']
+            row.total_response_time += delta['total_response_time']
+            histogram = row.latency_histogram or _empty_histogram()
+            row.latency_histogram = [a + b for a, b in zip(histogram, delta['latency_histogram'])]
+            to_update.append(row)
+
+        APICallRollup.objects.using(using).bulk_create(to_create)
+        APICallRollup.objects.using(using).bulk_update(
+            to_update, ['count', 'error_count', 'total_response_time', 'latency_histogram', 'updated_at'],
+        )
+    return len(deltas)
+
+
+def covering_ranges(start, end, granularities=('day', 'hour', 'minute')):
+    """Split [start, end) into (granularity, from, to) spans using the coarsest buckets that fit"""
+    start, end = truncate(start, 'minute'), truncate(end, 'minute')
+    if start >= end:
+        return []
+    coarse, finer = granularities[0], granularities[1:]
+    if not finer:
+        return [(coarse, start, end)]
+
+    inner_start, inner_end = _ceil(start, coarse), truncate(end, coarse)
+    if inner_start >= inner_end:
+        return covering_ranges(start, end, finer)
+    return (
+        covering_ranges(start, inner_start, finer)
+        + [(coarse, inner_start, inner_end)]
+        + covering_ranges(inner_end, end, finer)
+    )
+
+
+def _ceil(moment, granularity):
+    floor = truncate(moment, granularity)
+    return floor if floor == moment else floor + GRANULARITIES[granularity]
+
+
+def percentile_from_histogram(histogram, fraction):
+    """Interpolate a percentile (0-1) inside the fixed latency buckets"""
+    total = sum(histogram)
+    if not total:
+        return None
+    target = fraction * total
+    seen = 0.0
+    lower = 0.0
+    for index, weight in enumerate(histogram):
+        if index == len(LATENCY_BUCKETS):
+            return lower  # Open-ended bucket: best known bound
+        upper = LATENCY_BUCKETS[index]
+        if weight and seen + weight >= target:
+            return lower + (upper - lower) * (target - seen) / weight
+        seen += weight
+        lower = upper
+    return lower
+
+
+def latency_percentiles(platform, start, end, endpoint=None, status_classes=None, percentiles=(50, 95, 99)):
+    """Percentiles (seconds), call and error counts for [start, end) from rollups only"""
+    spans = Q()
+    for granularity, span_start, span_end in covering_ranges(start, end):
+        spans |= Q(granularity=granularity, bucket_start__gte=span_start, bucket_start__lt=span_end)
+    if not spans:
+        spans = Q(pk__in=[])
+    queryset = APICallRollup.objects.filter(spans, platform=platform)
+    if endpoint is not None:
+        queryset = queryset.filter(endpoint=endpoint_template(endpoint))
+    if status_classes is not None:
+        queryset = queryset.filter(status_class__in=status_classes)
+
+    histogram = _empty_histogram()
+    count = errors = total_time = 0.0
+    for row in queryset.only('count', 'error_count', 'total_response_time', 'latency_histogram'):
+        count += row.count
+        errors += row.error_count
+        total_time += row.total_response_time
+        histogram = [a + b for a, b in zip(histogram, row.latency_histogram)]
+
+    return {
+        'calls': count,
+        'errors': errors,
+        'avg_response_time': total_time / count if count else None,
+        'percentiles': {p: percentile_from_histogram(histogram, p / 100) for p in percentiles},
+    }
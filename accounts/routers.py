@@ -0,0 +1,61 @@
+"""
+Database router that keeps high-write telemetry out of the main database
+
+APICallLog and APICallRollup absorb a write for every outbound API call.
+Placing them in their own SQLite file (settings.TELEMETRY_DATABASE, default
+'telemetry') gives them their own write lock, so logging never queues
+behind account, session or token writes in db.sqlite3. When that alias is
+not configured the router steps aside and everything stays in 'default'.
+
+Telemetry rows reference users and accounts by id only (no database-level
+foreign keys), so cross-database joins are not possible. Filter by ids
+instead, and prefetch_related('social_account') rather than select_related.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+TELEMETRY_MODELS = frozenset({'apicalllog', 'apicallrollup'})
+
+
+def telemetry_database():
+    alias = getattr(settings, 'TELEMETRY_DATABASE', 'telemetry')
+    return alias if alias in settings.DATABASES else None
+
+
+def is_telemetry(model):
+    return model._meta.app_label == 'accounts' and model._meta.model_name in TELEMETRY_MODELS
+
+
+class TelemetryRouter:
+    """Route telemetry models to the telemetry database and nothing else there"""
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def _route(self, model, hints):
+        if is_telemetry(model):
+            return telemetry_database()
+        # Following log.social_account would otherwise stay on the log's database
+        instance = hints.get('instance')
+        if instance is not None and is_telemetry(type(instance)) and telemetry_database():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Telemetry rows point at accounts and users by id across databases
+        if is_telemetry(type(obj1)) or is_telemetry(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        telemetry = telemetry_database()
+        if telemetry is None:
+            return None
+        if app_label == 'accounts' and model_name in TELEMETRY_MODELS:
+            return db == telemetry
+        if db == telemetry:
+            return False
+        return None
@@ -0,0 +1,103 @@
+"""
+Batched removal of expired OAuth sessions and Django sessions
+
+Abandoned logins leave SessionData rows behind, and logged-out visitors
+leave django_session rows. The sweeper walks each table through its expiry
+index and deletes them with delete_in_chunks(), so login traffic is never
+queued behind one long DELETE.
+
+Schedule the sweep_expired_sessions command (cron or similar) to run it.
+Single-process deployments without a scheduler can opt in to an in-process
+sweep every INTERVAL seconds instead; the daemon thread is then started
+lazily by the first database-mode OAuth login.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from accounts.chunked import delete_in_chunks
+from accounts.models import SessionData
+
+DEFAULT_SESSION_SWEEPER_SETTINGS = {
+    'INTERVAL': 0,  # Seconds between in-process sweeps; 0 leaves sweeping to the command
+    'BATCH_SIZE': 500,  # Rows deleted per transaction
+    'PAUSE': 0.05,  # Seconds to yield the write lock between batches
+}
+
+# Session engines whose sessions live in the django_session table
+DB_SESSION_ENGINES = ('django.contrib.sessions.backends.db', 'django.contrib.sessions.backends.cached_db')
+
+
+class ExpiredSessionSweeper:
+    """Delete expired SessionData and django_session rows in small, index-driven batches"""
+
+    def __init__(self, batch_size=500, pause=0.05, interval=0):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    @classmethod
+    def from_settings(cls):
+        """Build the sweeper from DEFAULT_SESSION_SWEEPER_SETTINGS overridden by settings.SESSION_SWEEPER"""
+        config = {**DEFAULT_SESSION_SWEEPER_SETTINGS, **getattr(settings, 'SESSION_SWEEPER', {})}
+        return cls(batch_size=config['BATCH_SIZE'], pause=config['PAUSE'], interval=config['INTERVAL'])
+
+    def run(self, now=None, progress=None):
+        """Sweep both tables once and return deletion statistics"""
+        now = now or timezone.now()
+        stats = {'session_data': 0, 'django_sessions': 0, 'batches': 0, 'elapsed': 0.0}
+        start = time.perf_counter()
+
+        stats['session_data'] = self._sweep(
+            SessionData.objects.filter(expires_at__lt=now).order_by('expires_at'), stats, progress,
+        )
+        if settings.SESSION_ENGINE in DB_SESSION_ENGINES:
+            stats['django_sessions'] = self._sweep(
+                Session.objects.filter(expire_date__lt=now).order_by('expire_date'), stats, progress,
+            )
+
+        stats['elapsed'] = time.perf_counter() - start
+        return stats
+
+    def _sweep(self, expired, stats, progress):
+        def counted(deleted):
+            stats['batches'] += 1
+            if progress:
+                progress(stats)
+
+        return delete_in_chunks(expired, self.batch_size, self.pause, on_chunk=counted)
+
+    def ensure_running(self):
+        """Start the background sweep thread if INTERVAL opts in and it is not running yet"""
+        if self._thread is not None or not self.interval:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='session-sweeper', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                stats = self.run()
+            except DatabaseError as e:
+                print(f"⚠️ Expired session sweep failed, retrying in {self.interval}s: {e}")
+                continue
+            finally:
+                close_old_connections()
+            if stats['session_data'] or stats['django_sessions']:
+                print(f"🧹 Swept {stats['session_data']} OAuth sessions and {stats['django_sessions']} "
+                      f"Django sessions in {stats['batches']} batches ({stats['elapsed']:.2f}s)")
+
+
+session_sweeper = ExpiredSessionSweeper.from_settings()
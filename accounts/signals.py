@@ -0,0 +1,21 @@
+"""
+Cleanup of telemetry rows that the ORM cannot cascade to
+
+APICallLog lives in the telemetry database, so deleting a user or an
+account cannot cascade to it; these receivers remove the rows by id.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from accounts.models import APICallLog, SocialMediaAccount
+
+
+@receiver(post_delete, sender=SocialMediaAccount, dispatch_uid='accounts.delete_account_api_logs')
+def delete_account_api_logs(sender, instance, **kwargs):
+    APICallLog.objects.filter(social_account_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=User, dispatch_uid='accounts.delete_user_api_logs')
+def delete_user_api_logs(sender, instance, **kwargs):
+    APICallLog.objects.filter(user_id=instance.pk).delete()
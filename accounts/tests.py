@@ -1,3 +1,1534 @@
-from django.test import TestCase
+import asyncio
+import base64
+import importlib
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import wait as token_refresh_wait
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import OperationalError, connection, models
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from accounts import circuit, refresh_lock, transport
+from accounts.async_client import AsyncAPIClient
+from accounts.circuit import CircuitBreaker, CircuitOpenError
+from accounts.coalesce import inflight_requests
+from accounts.crypto import TokenCipher
+from accounts.log_sampling import LogSampler, weighted_call_stats
+from accounts.log_sink import BufferedLogSink, api_log_sink
+from accounts.models import APICallLog, APICallRollup, SessionData, SocialMediaAccount, UserAnalytics
+from accounts.pagination import PaginationError, iter_items, iter_pages
+from accounts.ratelimit import RateLimiter, endpoint_template
+from accounts.response_cache import FileBackend, LocMemBackend, ResponseCache, response_cache
+from accounts.retention import APILogPruner
+from accounts.routers import TelemetryRouter
+from accounts.purge import AccountPurger
+from accounts.retry import RetryPolicy
+from accounts.session_sweeper import ExpiredSessionSweeper
+from accounts.rollups import covering_ranges, latency_percentiles, record_calls as rollups_record_calls
+from accounts.token_cache import DecryptedTokenCache, token_cache
+from accounts.token_refresh import TokenRefreshSweeper
+from accounts.utils import APIClient, SessionManager, TokenManager
+from twitter.models import Tweet, TwitterFollower
+
+
+class TokenCipherTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        encrypted = TokenManager.encrypt_token('access-token-123')
+        self.assertNotEqual(encrypted, 'access-token-123')
+        self.assertEqual(TokenManager.decrypt_token(encrypted), 'access-token-123')
+
+    def test_empty_values(self):
+        self.assertEqual(TokenCipher.encrypt(''), '')
+        self.assertEqual(TokenCipher.decrypt(''), '')
+        self.assertEqual(TokenCipher.decrypt_many(['', None]), ['', ''])
+
+    def test_batch_preserves_order(self):
+        tokens = [f'token-{i}' for i in range(20)] + ['']
+        encrypted = TokenManager.encrypt_many(tokens)
+        self.assertEqual(TokenManager.decrypt_many(encrypted), tokens)
+
+    def test_tampered_token_returns_empty_string(self):
+        prefix, _, payload = TokenCipher.encrypt('secret-token').rpartition(':')
+        encrypted = bytearray(base64.urlsafe_b64decode(payload))
+        encrypted[-1] ^= 0x01
+        self.assertEqual(TokenCipher.decrypt(f"{prefix}:{base64.urlsafe_b64encode(bytes(encrypted)).decode()}"), '')
+
+    def test_envelope_names_active_key(self):
+        encrypted = TokenCipher.encrypt('secret-token')
+        self.assertTrue(encrypted.startswith(f"v1:{TokenCipher.active_key_id()}:"))
+        self.assertFalse(TokenCipher.needs_rotation(encrypted))
+
+    def test_fallback_key_still_decrypts_after_rotation(self):
+        encrypted = TokenCipher.encrypt('secret-token')
+        with self.settings(SECRET_KEY='rotated-secret', SECRET_KEY_FALLBACKS=[settings.SECRET_KEY]):
+            self.assertEqual(TokenCipher.decrypt(encrypted), 'secret-token')
+            self.assertEqual(TokenCipher.decrypt_many([encrypted]), ['secret-token'])
+            self.assertTrue(TokenCipher.needs_rotation(encrypted))
+        with self.settings(SECRET_KEY='rotated-secret', SECRET_KEY_FALLBACKS=[]):
+            self.assertEqual(TokenCipher.decrypt(encrypted), '')
+
+    def test_decrypts_legacy_xor_tokens(self):
+        key = settings.SECRET_KEY.encode()
+        token = 'legacy-token-value'
+        legacy = base64.b64encode(bytes(a ^ b for a, b in zip(token.encode(), key))).decode()
+        self.assertEqual(TokenCipher.decrypt(legacy), token)
+        self.assertEqual(TokenCipher.decrypt_many([legacy]), [token])
+
+    def test_legacy_xor_tokens_use_only_the_legacy_secret(self):
+        old_secret = 'old-secret-key-0123456789'
+        legacy = base64.b64encode(bytes(a ^ b for a, b in zip(b'legacy-token-value', old_secret.encode()))).decode()
+        # XOR under the new key would "succeed" with garbage, so it must not be tried first
+        with self.settings(SECRET_KEY='new-secret-key', SECRET_KEY_FALLBACKS=[old_secret]):
+            self.assertEqual(TokenCipher.decrypt(legacy), 'legacy-token-value')
+        with self.settings(SECRET_KEY='new-secret-key', SECRET_KEY_FALLBACKS=['other-secret'],
+                           LEGACY_TOKEN_SECRET=old_secret):
+            self.assertEqual(TokenCipher.decrypt(legacy), 'legacy-token-value')
+
+
+class DecryptedTokenCacheTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user('alice', password='pw')
+        self.account = TokenManager.store_tokens(
+            self.user, 'twitter', 'access-1', refresh_token='refresh-1', expires_in=3600,
+            user_data={'id': '42', 'username': 'alice'},
+        )
+
+    def test_repeat_lookups_skip_decryption(self):
+        self.assertEqual(TokenManager.get_valid_token(self.account), 'access-1')
+        with mock.patch.object(TokenManager, 'decrypt_token') as decrypt, \
+                mock.patch.object(SocialMediaAccount, 'is_token_expired') as is_expired:
+            for _ in range(5):
+                self.assertEqual(TokenManager.get_valid_token(self.account), 'access-1')
+        decrypt.assert_not_called()
+        is_expired.assert_not_called()
+
+    def test_store_tokens_invalidates(self):
+        TokenManager.get_valid_token(self.account)
+        self.assertEqual(len(token_cache), 1)
+        account = TokenManager.store_tokens(
+            self.user, 'twitter', 'access-2', expires_in=3600,
+            user_data={'id': '42', 'username': 'alice'},
+        )
+        self.assertEqual(len(token_cache), 0)
+        self.assertEqual(TokenManager.get_valid_token(account), 'access-2')
+
+    def test_disconnect_invalidates(self):
+        TokenManager.get_valid_token(self.account)
+        with mock.patch.object(TokenManager, '_revoke_platform_token'):
+            TokenManager.disconnect_account(self.user, 'twitter')
+        self.assertEqual(len(token_cache), 0)
+
+    def test_entries_dropped_at_expiry(self):
+        TokenManager.get_valid_token(self.account)
+        with mock.patch('accounts.token_cache.time.time', return_value=self.account.token_expires_at.timestamp() + 1):
+            self.assertIsNone(token_cache.get(self.account))
+        self.assertEqual(len(token_cache), 0)
+
+    def test_lru_eviction_is_bounded(self):
+        cache = DecryptedTokenCache(max_entries=2)
+        accounts = [
+            SocialMediaAccount(id=i, access_token=f'cipher-{i}', token_expires_at=timezone.now() + timedelta(hours=1))
+            for i in range(1, 4)
+        ]
+        for account in accounts:
+            cache.set(account, f'plain-{account.id}')
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(accounts[0]))
+        self.assertEqual(cache.get(accounts[2]), 'plain-3')
+
+
+def _token_response(access_token, refresh_token='rotated-refresh', status_code=200):
+    response = mock.Mock(status_code=status_code)
+    response.json.return_value = {
+        'access_token': access_token,
+        'refresh_token': refresh_token,
+        'expires_in': 7200,
+        'scope': 'tweet.read users.read follows.read offline.access',
+    }
+    return response
+
+
+class TokenRefreshTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user('bob', password='pw')
+
+    def _account(self, platform_user_id, expires_in, platform='twitter'):
+        account = TokenManager.store_tokens(
+            self.user, platform, f'access-{platform_user_id}', refresh_token=f'refresh-{platform_user_id}',
+            expires_in=3600, user_data={'id': platform_user_id, 'username': 'bob'},
+        )
+        account.token_expires_at = timezone.now() + timedelta(seconds=expires_in)
+        account.save()
+        return account
+
+    def test_expired_token_is_refreshed_in_place(self):
+        account = self._account('1', expires_in=-60)
+        with mock.patch('accounts.utils.transport.post', return_value=_token_response('fresh-access')) as post:
+            self.assertEqual(TokenManager.get_valid_token(account), 'fresh-access')
+        self.assertEqual(post.call_args.kwargs['data']['grant_type'], 'refresh_token')
+        self.assertEqual(post.call_args.kwargs['data']['refresh_token'], 'refresh-1')
+
+        account.refresh_from_db()
+        self.assertEqual(account.status, 'active')
+        self.assertGreater(account.token_expires_at, timezone.now())
+        self.assertEqual(TokenManager.decrypt_token(account.refresh_token), 'rotated-refresh')
+
+    def test_failed_refresh_marks_account_expired(self):
+        account = self._account('1', expires_in=-60)
+        with mock.patch('accounts.utils.transport.post', return_value=_token_response('', status_code=400)):
+            self.assertIsNone(TokenManager.get_valid_token(account))
+        account.refresh_from_db()
+        self.assertEqual(account.status, 'expired')
+
+    def test_sweeper_refreshes_only_expiring_accounts(self):
+        soon = self._account('1', expires_in=60)
+        later = self._account('2', expires_in=3 * 3600)
+        linkedin = self._account('3', expires_in=60, platform='linkedin')
+
+        with mock.patch('accounts.utils.transport.post', return_value=_token_response('swept-access')) as post:
+            stats = TokenRefreshSweeper(lookahead=timedelta(minutes=15), batch_size=1, max_workers=2).run()
+
+        self.assertEqual(post.call_count, 1)
+        self.assertEqual(stats, {'scanned': 1, 'refreshed': 1, 'failed': 0, 'expired': 0, 'skipped': 0})
+        for account in (soon, later, linkedin):
+            account.refresh_from_db()
+        self.assertEqual(TokenManager.decrypt_token(soon.access_token), 'swept-access')
+        self.assertEqual(TokenManager.decrypt_token(later.access_token), 'access-2')
+        self.assertEqual(TokenManager.decrypt_token(linkedin.access_token), 'access-3')
+
+    def test_sweeper_expires_dead_tokens_it_cannot_refresh(self):
+        dead = self._account('1', expires_in=-60)
+        pending = self._account('2', expires_in=60)
+        with mock.patch('accounts.utils.transport.post', return_value=_token_response('', status_code=400)):
+            stats = TokenRefreshSweeper(batch_size=10).run()
+        self.assertEqual(stats, {'scanned': 2, 'refreshed': 0, 'failed': 1, 'expired': 1, 'skipped': 0})
+        dead.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertEqual(dead.status, 'expired')
+        self.assertEqual(pending.status, 'active')
+
+    def test_sweeper_does_not_expire_a_token_replaced_during_its_refresh(self):
+        dead = self._account('1', expires_in=-60)
+
+        def refreshed_elsewhere(futures, **kwargs):
+            # Another process stores a new token while the sweep's refresh is in flight
+            SocialMediaAccount.objects.filter(pk=dead.pk).update(
+                access_token=TokenManager.encrypt_token('other-process-access'),
+            )
+            return token_refresh_wait(futures, **kwargs)
+
+        with mock.patch.object(TokenManager, 'request_token_refresh', return_value=None), \
+                mock.patch('accounts.token_refresh.wait', side_effect=refreshed_elsewhere):
+            stats = TokenRefreshSweeper(batch_size=10).run()
+        self.assertEqual((stats['expired'], stats['skipped']), (0, 1))
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, 'active')
+        self.assertIsNone(dead.refresh_lease_until)
+
+    def test_sweeper_leaves_a_lapsed_lease_to_its_new_holder(self):
+        soon = self._account('1', expires_in=60)
+        other_lease = timezone.now() + timedelta(minutes=5)
+
+        def lease_taken_over(futures, **kwargs):
+            # The sweep's lease lapses and an on-demand refresh claims the account
+            SocialMediaAccount.objects.filter(pk=soon.pk).update(refresh_lease_until=other_lease)
+            return token_refresh_wait(futures, **kwargs)
+
+        token_info = {'access_token': 'late-access', 'expires_in': 7200}
+        with mock.patch.object(TokenManager, 'request_token_refresh', return_value=token_info), \
+                mock.patch('accounts.token_refresh.wait', side_effect=lease_taken_over):
+            stats = TokenRefreshSweeper(batch_size=10).run()
+        self.assertEqual((stats['refreshed'], stats['skipped']), (0, 1))
+        soon.refresh_from_db()
+        self.assertEqual(TokenManager.decrypt_token(soon.access_token), 'access-1')
+        self.assertEqual(soon.refresh_lease_until, other_lease)
+
+
+class SingleFlightRefreshTests(TransactionTestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        user = User.objects.create_user('carol', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'stale-access', refresh_token='refresh-1', expires_in=3600,
+            user_data={'id': '7', 'username': 'carol'},
+        )
+        SocialMediaAccount.objects.filter(pk=self.account.pk).update(
+            token_expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_concurrent_callers_share_one_refresh(self):
+        calls = []
+
+        def slow_refresh(social_account):
+            calls.append(social_account.pk)
+            time.sleep(0.2)
+            return {'access_token': 'fresh-access', 'refresh_token': 'refresh-2', 'expires_in': 7200}
+
+        results = []
+        barrier = threading.Barrier(16)
+
+        def worker():
+            try:
+                # Each request loads its own copy of the row, as separate views would
+                social_account = SocialMediaAccount.objects.get(pk=self.account.pk)
+                barrier.wait()
+                results.append(TokenManager.get_valid_token(social_account))
+            finally:
+                connection.close()
+
+        with mock.patch.object(TokenManager, 'request_token_refresh', side_effect=slow_refresh):
+            threads = [threading.Thread(target=worker) for _ in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['fresh-access'] * 16)
+        self.account.refresh_from_db()
+        self.assertIsNone(self.account.refresh_lease_until)
+        self.assertEqual(TokenManager.decrypt_token(self.account.refresh_token), 'refresh-2')
+
+    def test_waits_for_lease_held_by_another_process(self):
+        # Simulate another worker process holding the lease and finishing its refresh
+        self.assertTrue(refresh_lock.acquire_refresh_lease(self.account.pk))
+
+        def other_process_finishes():
+            time.sleep(0.2)
+            SocialMediaAccount.objects.filter(pk=self.account.pk).update(
+                access_token=TokenManager.encrypt_token('other-process-access'),
+                token_expires_at=timezone.now() + timedelta(hours=2),
+                refresh_lease_until=None,
+            )
+            connection.close()
+
+        finisher = threading.Thread(target=other_process_finishes)
+        with mock.patch.object(TokenManager, 'request_token_refresh') as request_refresh:
+            finisher.start()
+            token = TokenManager.get_valid_token(SocialMediaAccount.objects.get(pk=self.account.pk))
+            finisher.join()
+
+        request_refresh.assert_not_called()
+        self.assertEqual(token, 'other-process-access')
+
+
+class RotateTokenKeysCommandTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def test_reencrypts_rows_under_new_key(self):
+        user = User.objects.create_user('dave', password='pw')
+        old_secret = settings.SECRET_KEY
+        for i in range(5):
+            TokenManager.store_tokens(
+                user, 'twitter', f'access-{i}', refresh_token=f'refresh-{i}',
+                user_data={'id': str(i), 'username': 'dave'},
+            )
+
+        with self.settings(SECRET_KEY='rotated-secret', SECRET_KEY_FALLBACKS=[old_secret]):
+            out = StringIO()
+            call_command('rotate_token_keys', chunk_size=2, batch_size=2, stdout=out)
+            self.assertIn('rotated 5', out.getvalue())
+
+            for account in SocialMediaAccount.objects.order_by('platform_user_id'):
+                self.assertFalse(TokenCipher.needs_rotation(account.access_token))
+                self.assertFalse(TokenCipher.needs_rotation(account.refresh_token))
+
+        with self.settings(SECRET_KEY='rotated-secret', SECRET_KEY_FALLBACKS=[]):
+            account = SocialMediaAccount.objects.get(platform_user_id='3')
+            self.assertEqual(TokenManager.decrypt_token(account.access_token), 'access-3')
+            self.assertEqual(TokenManager.decrypt_token(account.refresh_token), 'refresh-3')
+
+    def test_migrates_legacy_xor_rows_across_a_key_change(self):
+        user = User.objects.create_user('erin', password='pw')
+        old_secret = settings.SECRET_KEY
+        account = TokenManager.store_tokens(user, 'twitter', 'placeholder', user_data={'id': '9', 'username': 'erin'})
+        legacy = base64.b64encode(bytes(a ^ b for a, b in zip(b'legacy-access-token', old_secret.encode()))).decode()
+        SocialMediaAccount.objects.filter(pk=account.pk).update(access_token=legacy)
+
+        with self.settings(SECRET_KEY='rotated-secret', SECRET_KEY_FALLBACKS=[old_secret]):
+            call_command('rotate_token_keys', stdout=StringIO())
+        with self.settings(SECRET_KEY='rotated-secret', SECRET_KEY_FALLBACKS=[]):
+            account.refresh_from_db()
+            self.assertFalse(TokenCipher.needs_rotation(account.access_token))
+            self.assertEqual(TokenManager.decrypt_token(account.access_token), 'legacy-access-token')
+
+
+class StoreTokensUpsertTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user('erin', password='pw')
+
+    def test_store_tokens_is_one_statement(self):
+        user_data = {'id': '99', 'username': 'erin', 'name': 'Erin'}
+        with self.assertNumQueries(1):
+            created = TokenManager.store_tokens(self.user, 'twitter', 'access-1', user_data=user_data)
+        SocialMediaAccount.objects.filter(pk=created.pk).update(follower_count=12)
+
+        with self.assertNumQueries(1):
+            updated = TokenManager.store_tokens(self.user, 'twitter', 'access-2', user_data={'id': '99', 'name': 'Erin B'})
+
+        self.assertEqual(updated.pk, created.pk)
+        account = SocialMediaAccount.objects.get()
+        self.assertEqual(TokenManager.decrypt_token(account.access_token), 'access-2')
+        self.assertEqual(account.display_name, 'Erin B')
+        # Keys the platform did not send and columns outside the upsert are left alone
+        self.assertEqual(account.username, 'erin')
+        self.assertEqual(account.follower_count, 12)
+
+    def test_upsert_accounts_bulk_import(self):
+        TokenManager.store_tokens(self.user, 'linkedin', 'old', user_data={'id': 'a', 'username': 'old'})
+        accounts = [
+            SocialMediaAccount(
+                user=self.user, platform='linkedin', platform_user_id=platform_user_id,
+                username=platform_user_id, access_token=TokenManager.encrypt_token(f'token-{platform_user_id}'),
+            )
+            for platform_user_id in ('a', 'b', 'c')
+        ]
+        TokenManager.upsert_accounts(accounts, ['username', 'access_token', 'updated_at'], batch_size=2)
+
+        self.assertEqual(SocialMediaAccount.objects.count(), 3)
+        self.assertTrue(all(account.pk for account in accounts))
+        self.assertEqual(SocialMediaAccount.objects.get(platform_user_id='a').username, 'a')
+
+
+class TransportTests(SimpleTestCase):
+
+    def tearDown(self):
+        transport.close_sessions()
+
+    def test_one_session_per_platform(self):
+        self.assertIs(transport.get_session('twitter'), transport.get_session('twitter'))
+        self.assertIsNot(transport.get_session('twitter'), transport.get_session('linkedin'))
+
+    def test_requests_get_default_timeout(self):
+        with self.settings(HTTP_TRANSPORT={'CONNECT_TIMEOUT': 1, 'READ_TIMEOUT': 2}):
+            with mock.patch('requests.Session.request') as session_request:
+                transport.get('twitter', 'https://api.twitter.com/2/users/me')
+        self.assertEqual(session_request.call_args.kwargs['timeout'], (1, 2))
+
+    def test_sessions_do_not_keep_cookies(self):
+        session = transport.get_session('linkedin')
+        self.assertEqual(session.cookies.get_policy().allowed_domains(), ())
+
+
+class AsyncAPIClientTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        response_cache.clear()
+        user = User.objects.create_user('frank', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'async-access', expires_in=3600, user_data={'id': '5', 'username': 'frank'},
+        )
+
+    async def test_concurrent_calls_are_bounded_per_platform(self):
+        in_flight = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            self.assertEqual(request.headers['Authorization'], 'Bearer async-access')
+            return httpx.Response(200, json={'data': {'path': request.url.path}})
+
+        def build_pool():
+            return httpx.AsyncClient(transport=httpx.MockTransport(handler)), asyncio.Semaphore(4)
+
+        client = AsyncAPIClient(self.account)
+        with mock.patch('accounts.transport._build_async_pool', side_effect=build_pool):
+            results = await asyncio.gather(*(client.make_request(f'users/{i}') for i in range(20)))
+            await transport.aclose_sessions()
+
+        self.assertEqual([r['data']['path'] for r in results], [f'/2/users/{i}' for i in range(20)])
+        self.assertLessEqual(peak, 4)
+        await sync_to_async(api_log_sink.flush)()
+        self.assertEqual(await APICallLog.objects.filter(status_code=200).acount(), 20)
+
+    async def test_error_response_returns_none(self):
+        def build_pool():
+            mock_transport = httpx.MockTransport(lambda request: httpx.Response(500, text='boom'))
+            return httpx.AsyncClient(transport=mock_transport), asyncio.Semaphore(4)
+
+        client = AsyncAPIClient(self.account, retry_policy=RetryPolicy(max_attempts=2, base_delay=0))
+        with mock.patch('accounts.transport._build_async_pool', side_effect=build_pool):
+            self.assertIsNone(await client.make_request('users/me'))
+            await transport.aclose_sessions()
+        self.assertEqual(client.last_status_code, 500)
+        await sync_to_async(api_log_sink.flush)()
+        self.assertTrue(await APICallLog.objects.filter(attempt=2, error_message='Gave up after 2 attempts: boom').aexists())
+
+
+def _api_response(status_code, payload=None, headers=None, text=''):
+    response = mock.Mock(status_code=status_code, headers=headers or {}, text=text)
+    response.json.return_value = payload
+    return response
+
+
+class RetryPolicyTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        response_cache.clear()
+        user = User.objects.create_user('gina', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'retry-access', expires_in=3600, user_data={'id': '8', 'username': 'gina'},
+        )
+
+    def test_retries_transient_failures_then_succeeds(self):
+        responses = [
+            _api_response(503, text='unavailable'),
+            _api_response(429, headers={'x-rate-limit-reset': str(int(time.time()) + 2)}, text='slow down'),
+            _api_response(200, payload={'data': 'ok'}),
+        ]
+        client = APIClient(self.account, retry_policy=RetryPolicy(base_delay=1, random_func=lambda: 0.5))
+        with mock.patch('accounts.utils.transport.request', side_effect=responses), \
+                mock.patch('accounts.utils.time.sleep') as sleep:
+            self.assertEqual(client.make_request('users/me'), {'data': 'ok'})
+
+        first_delay, reset_delay = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(first_delay, 0.5)
+        self.assertAlmostEqual(reset_delay, 2, delta=1)
+        self.assertEqual(client.last_status_code, 200)
+        api_log_sink.flush()
+        self.assertTrue(APICallLog.objects.filter(attempt=2, error_message__startswith='Retrying in').exists())
+        self.assertTrue(APICallLog.objects.filter(attempt=3, status_code=200).exists())
+
+    def test_non_idempotent_methods_are_not_retried(self):
+        client = APIClient(self.account)
+        with mock.patch('accounts.utils.transport.request', return_value=_api_response(503, text='down')) as request, \
+                mock.patch('accounts.utils.time.sleep') as sleep:
+            self.assertIsNone(client.make_request('tweets', method='POST', data={'text': 'hi'}))
+        self.assertEqual(request.call_count, 1)
+        sleep.assert_not_called()
+        self.assertEqual(client.last_status_code, 503)
+
+    def test_gives_up_when_reset_exceeds_budget(self):
+        response = _api_response(429, headers={'x-rate-limit-reset': str(int(time.time()) + 900)}, text='limited')
+        client = APIClient(self.account, retry_policy=RetryPolicy(total_budget=60))
+        with mock.patch('accounts.utils.transport.request', return_value=response) as request, \
+                mock.patch('accounts.utils.time.sleep') as sleep:
+            self.assertIsNone(client.make_request('users/me'))
+        self.assertEqual(request.call_count, 1)
+        sleep.assert_not_called()
+        self.assertEqual(client.last_status_code, 429)
+        api_log_sink.flush()
+        self.assertTrue(APICallLog.objects.filter(error_message='Gave up after 1 attempts: limited').exists())
+
+    def test_retry_after_header(self):
+        policy = RetryPolicy()
+        deadline = policy.deadline()
+        self.assertEqual(policy.next_delay(1, 503, {'Retry-After': '7'}, deadline), 7.0)
+        self.assertIsNone(policy.next_delay(policy.max_attempts, 503, {}, deadline))
+        self.assertFalse(policy.is_retryable('GET', 404))
+
+
+class RateLimiterTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        response_cache.clear()
+        user = User.objects.create_user('hank', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'limited-access', expires_in=3600, user_data={'id': '9', 'username': 'hank'},
+        )
+        self.reset = int(time.time()) + 600
+
+    def test_budget_is_drawn_down_then_calls_are_deferred(self):
+        limiter = RateLimiter()
+        limiter.record(self.account, 'users/me', {'x-rate-limit-remaining': '2', 'x-rate-limit-reset': str(self.reset)})
+        self.assertEqual(limiter.reserve(self.account, 'users/me'), 0)
+        self.assertEqual(limiter.reserve(self.account, 'users/me'), 0)
+        self.assertGreater(limiter.reserve(self.account, 'users/me'), 500)
+        # Other endpoints keep their own budget
+        self.assertEqual(limiter.reserve(self.account, 'tweets'), 0)
+
+    def test_exhausted_budget_skips_the_request(self):
+        headers = {'x-rate-limit-remaining': '0', 'x-rate-limit-reset': str(self.reset)}
+        client = APIClient(self.account)
+        with mock.patch('accounts.utils.transport.request', return_value=_api_response(200, {'data': 1}, headers)) as request:
+            self.assertEqual(client.make_request('tweets/search/recent'), {'data': 1})
+            self.assertIsNone(client.make_request('tweets/search/recent'))
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(client.last_status_code, 429)
+
+    def test_budget_rebuilt_from_call_log(self):
+        APIClient(self.account)._log_api_call(
+            'users/me', 'GET', 200, 0.1, {'x-rate-limit-remaining': '0', 'x-rate-limit-reset': str(self.reset)},
+        )
+        api_log_sink.flush()
+        log = APICallLog.objects.get()
+        self.assertEqual(log.rate_limit_remaining, 0)
+        self.assertEqual(int(log.rate_limit_reset.timestamp()), self.reset)
+
+        # A fresh limiter with nothing cached, as after a restart
+        self.assertGreater(RateLimiter().reserve(self.account, 'users/me'), 500)
+
+    def test_budget_rebuilt_from_another_id_on_the_same_route(self):
+        client = APIClient(self.account)
+        headers = {'x-rate-limit-remaining': '0', 'x-rate-limit-reset': str(self.reset)}
+        client._log_api_call('tweets/1', 'GET', 200, 0.1, headers)
+        client._log_api_call('tweets/1/liking_users', 'GET', 200, 0.1, {**headers, 'x-rate-limit-remaining': '50'})
+        api_log_sink.flush()
+
+        self.assertGreater(RateLimiter().reserve(self.account, 'tweets/2?expansions=author_id'), 500)
+
+    def test_ids_in_the_path_share_their_routes_budget(self):
+        limiter = RateLimiter()
+        limiter.record(self.account, 'tweets/1', {'x-rate-limit-remaining': '1', 'x-rate-limit-reset': str(self.reset)})
+        self.assertEqual(limiter.reserve(self.account, 'tweets/2'), 0)
+        self.assertGreater(limiter.reserve(self.account, 'tweets/3?expansions=author_id'), 500)
+        self.assertEqual(endpoint_template('users/by/username/hank'), 'users/by/username/:username')
+
+    def test_cache_failures_let_the_call_through(self):
+        limiter = RateLimiter()
+        with mock.patch.object(limiter.cache, 'get_many', side_effect=ConnectionError('cache down')):
+            self.assertEqual(limiter.reserve(self.account, 'users/me'), 0)
+
+    def test_calls_do_not_touch_the_main_database(self):
+        headers = {'x-rate-limit-remaining': '50', 'x-rate-limit-reset': str(self.reset)}
+        client = APIClient(self.account)
+        with mock.patch('accounts.utils.transport.request', return_value=_api_response(200, {'data': 1}, headers)):
+            client.make_request('tweets/search/recent')
+            with self.assertNumQueries(0):
+                client.make_request('tweets/search/recent', params={'query': 'django'})
+
+
+class ResponseCacheTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        user = User.objects.create_user('iris', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'cached-access', expires_in=3600, user_data={'id': '10', 'username': 'iris'},
+        )
+        self.cache = ResponseCache(LocMemBackend(), ttls={'twitter:users/me': 300})
+
+    def test_fresh_hit_skips_the_request(self):
+        client = APIClient(self.account, cache=self.cache)
+        with mock.patch('accounts.utils.transport.request', return_value=_api_response(200, {'data': 1})) as request:
+            self.assertEqual(client.make_request('users/me'), {'data': 1})
+            self.assertEqual(client.make_request('users/me'), {'data': 1})
+            # Endpoints without a TTL are never cached
+            client.make_request('tweets/search/recent')
+            client.make_request('tweets/search/recent')
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(client.last_status_code, 200)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'revalidated': 0, 'stored': 1})
+
+    def test_stale_entry_is_revalidated_with_etag(self):
+        client = APIClient(self.account, cache=self.cache)
+        key = self.cache.make_key(self.account, 'users/me', None)
+        entry = self.cache.store(key, {'data': 'old'}, {'ETag': '"v1"'}, ttl=300)
+        entry.fresh_until = 0
+        self.cache.backend.set(key, entry.to_json(), 300)
+
+        with mock.patch('accounts.utils.transport.request', return_value=_api_response(304)) as request:
+            self.assertEqual(client.make_request('users/me'), {'data': 'old'})
+        self.assertEqual(request.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+        self.assertTrue(self.cache.get(key).is_fresh())
+        self.assertEqual(self.cache.stats()['revalidated'], 1)
+
+    def test_callers_cannot_mutate_cached_payloads(self):
+        client = APIClient(self.account, cache=self.cache)
+        with mock.patch('accounts.utils.transport.request', return_value=_api_response(200, {'data': {'id': '10'}})):
+            client.make_request('users/me')['data']['id'] = 'mutated'
+        client.make_request('users/me')['data'].clear()
+        self.assertEqual(client.make_request('users/me'), {'data': {'id': '10'}})
+
+    def test_backends_are_bounded(self):
+        locmem = LocMemBackend(max_entries=2)
+        for i in range(3):
+            locmem.set(f'k{i}', i, 60)
+        self.assertIsNone(locmem.get('k0'))
+        self.assertEqual(locmem.get('k2'), 2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            files = FileBackend(directory, max_entries=10)
+            for i in range(15):
+                files.set(f'k{i}', i, 60)
+            self.assertLessEqual(len(os.listdir(directory)), 10)
+            self.assertEqual(files.get('k14'), 14)
+
+    @skipUnless(hasattr(os, 'getuid'), 'POSIX permissions')
+    def test_file_backend_refuses_a_shared_directory(self):
+        with tempfile.TemporaryDirectory() as parent:
+            private = os.path.join(parent, 'private')
+            FileBackend(private)
+            self.assertEqual(os.stat(private).st_mode & 0o777, 0o700)
+
+            os.chmod(private, 0o777)
+            with self.assertRaises(ImproperlyConfigured):
+                FileBackend(private)
+
+
+class RequestCoalescingTests(TransactionTestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        user = User.objects.create_user('jack', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'shared-access', expires_in=3600, user_data={'id': '11', 'username': 'jack'},
+        )
+
+    def test_concurrent_threads_share_one_call(self):
+        coalesced_before = inflight_requests.coalesced
+
+        def slow_response(*args, **kwargs):
+            # Hold the leader's call open until every follower has joined it
+            deadline = time.monotonic() + 2
+            while inflight_requests.coalesced - coalesced_before < 7 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return _api_response(200, {'data': {'followers': 3}})
+
+        results = []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            try:
+                client = APIClient(SocialMediaAccount.objects.get(pk=self.account.pk))
+                barrier.wait()
+                results.append((client.make_request('users/11/followers', params={'max_results': 5}),
+                                client.last_status_code))
+            finally:
+                connection.close()
+
+        with mock.patch('accounts.utils.transport.request', side_effect=slow_response) as request:
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(results, [({'data': {'followers': 3}}, 200)] * 8)
+        api_log_sink.flush()
+        self.assertEqual(APICallLog.objects.count(), 1)
+
+    def test_concurrent_coroutines_share_one_call(self):
+        calls = []
+
+        async def handler(request):
+            calls.append(str(request.url))
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={'data': {'id': '11'}})
+
+        def build_pool():
+            return httpx.AsyncClient(transport=httpx.MockTransport(handler)), asyncio.Semaphore(4)
+
+        async def run():
+            client = AsyncAPIClient(self.account)
+            results = await asyncio.gather(
+                *(client.make_request('users/11') for _ in range(10)),
+                client.make_request('users/11', params={'user.fields': 'description'}),
+            )
+            await transport.aclose_sessions()
+            return results
+
+        with mock.patch('accounts.transport._build_async_pool', side_effect=build_pool):
+            results = asyncio.run(run())
+
+        self.assertEqual(results, [{'data': {'id': '11'}}] * 11)
+        self.assertEqual(len(calls), 2)
+        api_log_sink.flush()
+        self.assertEqual(APICallLog.objects.count(), 2)
+
+
+class ExecuteBatchTests(TransactionTestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        user = User.objects.create_user('kate', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'batch-access', expires_in=3600, user_data={'id': '12', 'username': 'kate'},
+        )
+        self.policy = RetryPolicy(max_attempts=1)
+
+    def test_results_keep_input_order_and_report_failures(self):
+        lock = threading.Lock()
+        in_flight = 0
+        peak = 0
+
+        def respond(platform, method, url, **kwargs):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            if url.endswith('/missing'):
+                return _api_response(404, text='not found')
+            return _api_response(200, {'url': url})
+
+        calls = [f'tweets/{i}' for i in range(12)] + [{'endpoint': 'missing'}]
+        # Keep bookkeeping writes off the in-memory test database, which rejects concurrent writers
+        client = APIClient(
+            self.account, retry_policy=self.policy, rate_limiter=RateLimiter(cache_alias='default'),
+            circuit_breaker=CircuitBreaker(cache_alias='default'),
+        )
+        with mock.patch('accounts.utils.transport.request', side_effect=respond), \
+                mock.patch.object(APIClient, '_log_api_call'):
+            results = client.execute_batch(calls, max_concurrency=4)
+        connection.close()
+
+        self.assertEqual([r.data['url'] for r in results[:12]], [f'https://api.twitter.com/2/tweets/{i}' for i in range(12)])
+        self.assertTrue(all(r.ok and r.status_code == 200 for r in results[:12]))
+        self.assertFalse(results[-1].ok)
+        self.assertEqual((results[-1].status_code, results[-1].error), (404, 'HTTP 404'))
+        self.assertLessEqual(peak, 4)
+        self.assertGreater(peak, 1)
+
+    def test_invalid_item_is_rejected(self):
+        with self.assertRaises(ValueError):
+            APIClient(self.account).execute_batch([{'url': 'tweets'}])
+
+    def test_benchmark_command_runs_against_the_stub(self):
+        out = StringIO()
+        call_command('bench_api_batch', '--requests', '6', '--latency-ms', '0', '--concurrency', '1', '2', stdout=out)
+        connection.close()
+        lines = [line for line in out.getvalue().splitlines() if line.startswith('concurrency')]
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(all(line.endswith(' 0 failed') for line in lines), out.getvalue())
+
+    def test_async_batch(self):
+        def handler(request):
+            if request.url.path.endswith('/boom'):
+                return httpx.Response(500, text='boom')
+            return httpx.Response(200, json={'path': request.url.path})
+
+        def build_pool():
+            return httpx.AsyncClient(transport=httpx.MockTransport(handler)), asyncio.Semaphore(4)
+
+        async def run():
+            client = AsyncAPIClient(self.account, retry_policy=self.policy)
+            results = await client.execute_batch(['tweets/1', 'boom', 'tweets/2'], max_concurrency=2)
+            await transport.aclose_sessions()
+            return results
+
+        with mock.patch('accounts.transport._build_async_pool', side_effect=build_pool):
+            results = asyncio.run(run())
+
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertEqual(results[2].data, {'path': '/2/tweets/2'})
+        self.assertEqual(results[1].status_code, 500)
+
+
+class PaginationTests(TransactionTestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        self.user = User.objects.create_user('liam', password='pw')
+        self.twitter = TokenManager.store_tokens(
+            self.user, 'twitter', 'page-access', expires_in=3600, user_data={'id': '13', 'username': 'liam'},
+        )
+
+    def tearDown(self):
+        connection.close()
+
+    @staticmethod
+    def _twitter_pages(platform, method, url, params=None, **kwargs):
+        token = params.get('pagination_token')
+        pages = {
+            None: ({'data': [{'id': '1'}, {'id': '2'}], 'meta': {'next_token': 'b'}}),
+            'b': ({'data': [{'id': '3'}, {'id': '4'}], 'meta': {'next_token': 'c'}}),
+            'c': ({'data': [{'id': '5'}], 'meta': {'result_count': 1}}),
+        }
+        return _api_response(200, pages[token])
+
+    def test_twitter_items_follow_next_token(self):
+        client = APIClient(self.twitter)
+        with mock.patch('accounts.utils.transport.request', side_effect=self._twitter_pages) as request:
+            items = [item['id'] for item in iter_items(client, 'users/13/followers', page_size=2)]
+        self.assertEqual(items, ['1', '2', '3', '4', '5'])
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(request.call_args_list[0].kwargs['params'], {'max_results': 2})
+
+    def test_next_page_is_prefetched_and_cursor_resumes(self):
+        client = APIClient(self.twitter)
+        with mock.patch('accounts.utils.transport.request', side_effect=self._twitter_pages) as request:
+            pages = iter_pages(client, 'users/13/followers')
+            first = next(pages)
+            deadline = time.monotonic() + 2
+            while request.call_count < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(request.call_count, 2)
+            pages.close()
+
+            resumed = [page.cursor for page in iter_pages(client, 'users/13/followers', cursor=first.next_cursor)]
+        self.assertEqual(resumed, ['b', 'c'])
+
+    def test_failed_page_reports_resume_cursor(self):
+        responses = [_api_response(200, {'data': [{'id': '1'}], 'meta': {'next_token': 'b'}}), _api_response(404)]
+        client = APIClient(self.twitter, retry_policy=RetryPolicy(max_attempts=1))
+        with mock.patch('accounts.utils.transport.request', side_effect=responses):
+            pages = iter_pages(client, 'users/13/followers', prefetch=False)
+            self.assertEqual(len(next(pages).items), 1)
+            with self.assertRaises(PaginationError) as raised:
+                next(pages)
+        self.assertEqual((raised.exception.cursor, raised.exception.status_code), ('b', 404))
+
+    def test_linkedin_start_count(self):
+        linkedin = TokenManager.store_tokens(
+            self.user, 'linkedin', 'li-access', expires_in=3600, user_data={'id': 'li-13', 'name': 'Liam'},
+        )
+
+        def respond(platform, method, url, params=None, **kwargs):
+            start, count = params['start'], params['count']
+            elements = [{'id': i} for i in range(start, min(start + count, 5))]
+            return _api_response(200, {'elements': elements, 'paging': {'start': start, 'count': count}})
+
+        with mock.patch('accounts.utils.transport.request', side_effect=respond) as request:
+            pages = list(iter_pages(APIClient(linkedin), 'shares', page_size=2))
+        self.assertEqual([page.cursor for page in pages], [None, 2, 4])
+        self.assertEqual([item['id'] for page in pages for item in page.items], [0, 1, 2, 3, 4])
+        self.assertEqual(request.call_count, 3)
+
+
+class CircuitBreakerTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        response_cache.clear()
+        caches['default'].clear()
+        user = User.objects.create_user('mia', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'breaker-access', expires_in=3600, user_data={'id': '14', 'username': 'mia'},
+        )
+        self.breaker = CircuitBreaker(cache_alias='default', min_calls=4, error_rate=0.5, slow_call_seconds=1)
+
+    def tearDown(self):
+        caches['default'].clear()
+        circuit._opened_here.clear()
+
+    def test_error_rate_opens_circuit_and_client_fails_fast(self):
+        for status_code in (200, 503, 0, 502):
+            self.breaker.record('twitter', 'users/me', status_code, 0.1)
+        self.assertEqual(self.breaker.status('twitter')['state'], 'open')
+
+        client = APIClient(self.account, circuit_breaker=self.breaker)
+        with mock.patch('accounts.utils.transport.request') as request:
+            with self.assertRaises(CircuitOpenError) as raised:
+                client.make_request('tweets/search/recent')
+        request.assert_not_called()
+        self.assertEqual(raised.exception.scope, 'twitter')
+        api_log_sink.flush()
+        self.assertFalse(APICallLog.objects.exists())
+        # Other platforms are unaffected
+        self.assertFalse(self.breaker.allow('linkedin'))
+
+    def test_slow_calls_open_circuit(self):
+        for elapsed in (2, 3, 4, 5):
+            self.breaker.record('twitter', 'users/me', 200, elapsed)
+        self.assertEqual(self.breaker.status('twitter')['state'], 'open')
+
+    def test_half_open_lets_one_probe_through(self):
+        breaker = CircuitBreaker(cache_alias='default', min_calls=1, open_seconds=0)
+        breaker.record('twitter', 'users/me', 500, 0.1)
+        self.assertEqual(breaker.status('twitter')['state'], 'half-open')
+
+        self.assertTrue(breaker.allow('twitter'))
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow('twitter')
+
+        breaker.record('twitter', 'users/me', 500, 0.1, probe=True)
+        self.assertTrue(breaker.allow('twitter'))
+        breaker.record('twitter', 'users/me', 200, 0.1, probe=True)
+        self.assertEqual(breaker.status('twitter')['state'], 'closed')
+        self.assertFalse(breaker.allow('twitter'))
+
+    def test_per_endpoint_scopes_and_status_command(self):
+        breaker = CircuitBreaker(cache_alias='default', min_calls=1, per_endpoint=True)
+        breaker.record('twitter', 'tweets/search/recent', 500, 0.1)
+        self.assertFalse(breaker.allow('twitter', 'users/me'))
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow('twitter', 'tweets/search/recent')
+
+        out = StringIO()
+        with self.settings(CIRCUIT_BREAKER={'CACHE': 'default', 'PER_ENDPOINT': True}):
+            call_command('circuit_status', stdout=out)
+        self.assertIn('twitter:tweets/search/recent', out.getvalue())
+        self.assertIn('open', out.getvalue())
+
+    def test_deferred_probe_is_released(self):
+        breaker = CircuitBreaker(cache_alias='default', min_calls=1, open_seconds=0)
+        breaker.record('twitter', 'users/me', 500, 0.1)
+        limiter = RateLimiter(cache_alias='default')
+        limiter.record(self.account, 'users/me', {'x-rate-limit-remaining': '0', 'x-rate-limit-reset': str(int(time.time()) + 600)})
+
+        client = APIClient(self.account, rate_limiter=limiter, circuit_breaker=breaker)
+        with mock.patch('accounts.utils.transport.request') as request:
+            self.assertIsNone(client.make_request('users/me'))
+        request.assert_not_called()
+        self.assertEqual(client.last_status_code, 429)
+        self.assertTrue(breaker.allow('twitter'))
+
+    def test_open_circuit_survives_cache_eviction(self):
+        for status_code in (500, 500, 500, 500):
+            self.breaker.record('twitter', 'users/me', status_code, 0.1)
+        caches['default'].clear()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.allow('twitter')
+        self.breaker.reset('twitter')
+        self.assertFalse(self.breaker.allow('twitter'))
+
+
+class BufferedLogSinkTests(TransactionTestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        user = User.objects.create_user('noah', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'sink-access', expires_in=3600, user_data={'id': '15', 'username': 'noah'},
+        )
+
+    def tearDown(self):
+        connection.close()
+
+    def _log(self, status_code=200):
+        return APICallLog(
+            user_id=self.account.user_id, social_account=self.account, endpoint='users/me', method='GET',
+            status_code=status_code, response_time=0.1,
+        )
+
+    def test_full_batch_is_flushed_in_the_background(self):
+        sink = BufferedLogSink(APICallLog, max_batch=3, flush_interval=60)
+        for _ in range(3):
+            sink.submit(self._log())
+        deadline = time.monotonic() + 2
+        while sink.written < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sink.close()
+        self.assertEqual(APICallLog.objects.count(), 3)
+
+    def test_full_queue_flushes_inline_and_close_drains(self):
+        sink = BufferedLogSink(APICallLog, max_batch=100, flush_interval=60, max_queue=2)
+        sink.submit(self._log())
+        self.assertEqual(APICallLog.objects.count(), 0)
+        sink.submit(self._log())
+        self.assertEqual(APICallLog.objects.count(), 2)
+
+        sink.submit(self._log(503))
+        sink.close()
+        self.assertEqual(APICallLog.objects.count(), 3)
+        self.assertEqual(sink.pending(), 0)
+
+    def test_failing_flushes_keep_the_buffer_bounded(self):
+        sink = BufferedLogSink(APICallLog, max_batch=100, flush_interval=60, max_queue=3)
+        with mock.patch.object(APICallLog.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+            for _ in range(5):
+                sink.submit(self._log())
+            self.assertEqual((sink.pending(), sink.dropped), (3, 2))
+
+        sink.close()
+        self.assertEqual(APICallLog.objects.count(), 3)
+
+    def test_error_response_is_logged_once(self):
+        client = APIClient(self.account)
+        with mock.patch('accounts.utils.transport.request', return_value=_api_response(400, text='bad request')):
+            self.assertIsNone(client.make_request('tweets', method='POST', data={'text': 'hi'}))
+        api_log_sink.flush()
+        self.assertEqual(list(APICallLog.objects.values_list('status_code', 'error_message')), [(400, 'bad request')])
+
+
+class LogSamplingTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.addCleanup(api_log_sink.flush)
+        user = User.objects.create_user('olga', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'sampled-access', expires_in=3600, user_data={'id': '16', 'username': 'olga'},
+        )
+
+    def test_errors_and_slow_calls_are_always_kept(self):
+        sampler = LogSampler(default_rate=0.25, rates={'twitter:users/me': 0.5}, random_func=lambda: 0.9)
+        self.assertEqual(sampler.sample_weight('twitter', 'users/me', 500, 0.1), 1.0)
+        self.assertEqual(sampler.sample_weight('twitter', 'users/me', 429, 0.1), 1.0)
+        self.assertEqual(sampler.sample_weight('twitter', 'users/me', 200, 5.0), 1.0)
+        self.assertEqual(sampler.sample_weight('twitter', 'users/me', 200, 0.1), 0)
+
+        sampler.random_func = lambda: 0.1
+        self.assertEqual(sampler.sample_weight('twitter', 'users/me', 200, 0.1), 2.0)
+        self.assertEqual(sampler.sample_weight('twitter', 'tweets', 200, 0.1), 4.0)
+        self.assertEqual(sampler.rate_for('linkedin', 'userinfo'), 0.25)
+
+    def test_weighted_stats_stay_unbiased(self):
+        rng = random.Random(17)
+        with self.settings(API_LOG_SAMPLING={'DEFAULT_RATE': 0.1}):
+            client = APIClient(self.account)
+        client.log_sampler.random_func = rng.random
+        for i in range(2000):
+            client._log_api_call('users/me', 'GET', 200, 0.2, {})
+        for i in range(50):
+            client._log_api_call('users/me', 'GET', 503, 1.0, {})
+        api_log_sink.flush()
+
+        self.assertLess(APICallLog.objects.count(), 400)
+        stats = weighted_call_stats(APICallLog.objects.filter(social_account=self.account))
+        self.assertAlmostEqual(stats['calls'], 2050, delta=2050 * 0.15)
+        self.assertEqual(stats['errors'], 50)
+        self.assertAlmostEqual(stats['avg_response_time'], (2000 * 0.2 + 50 * 1.0) / 2050, delta=0.02)
+
+
+class APICallRollupTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        user = User.objects.create_user('pia', password='pw')
+        self.account = TokenManager.store_tokens(
+            user, 'twitter', 'rollup-access', expires_in=3600, user_data={'id': '17', 'username': 'pia'},
+        )
+        self.sink = BufferedLogSink(APICallLog, flush_interval=60, on_flush=rollups_record_calls)
+        self.addCleanup(self.sink.close)
+
+    def _log(self, created_at, response_time, status_code=200, weight=1.0, endpoint='users/me'):
+        self.sink.submit(APICallLog(
+            user_id=self.account.user_id, social_account=self.account, endpoint=endpoint, method='GET',
+            status_code=status_code, response_time=response_time, sample_weight=weight, created_at=created_at,
+        ))
+
+    def test_covering_ranges_use_coarsest_buckets(self):
+        start = datetime(2026, 10, 1, 10, 30, tzinfo=dt_timezone.utc)
+        end = datetime(2026, 10, 3, 2, 15, tzinfo=dt_timezone.utc)
+        self.assertEqual([(g, a.isoformat()[5:16], b.isoformat()[5:16]) for g, a, b in covering_ranges(start, end)], [
+            ('minute', '10-01T10:30', '10-01T11:00'),
+            ('hour', '10-01T11:00', '10-02T00:00'),
+            ('day', '10-02T00:00', '10-03T00:00'),
+            ('hour', '10-03T00:00', '10-03T02:00'),
+            ('minute', '10-03T02:00', '10-03T02:15'),
+        ])
+
+    def test_percentiles_from_rollups_alone(self):
+        day = datetime(2026, 10, 5, tzinfo=dt_timezone.utc)
+        for i in range(90):
+            self._log(day + timedelta(hours=3, seconds=i), 0.03)
+        self.sink.flush()
+        # A second flush adds to the same buckets
+        for i in range(9):
+            self._log(day + timedelta(hours=20, seconds=i), 0.7, weight=1.0)
+        self._log(day + timedelta(hours=23), 3.0, status_code=503)
+        self.sink.flush()
+
+        self.assertEqual(APICallRollup.objects.filter(granularity='day').count(), 2)  # 2xx and 5xx
+        self.assertEqual(APICallRollup.objects.get(granularity='day', status_class='2xx').count, 99)
+
+        with self.assertNumQueries(1, using='telemetry'):
+            whole_day = latency_percentiles(
+                'twitter', day, day + timedelta(days=1), endpoint='users/me', percentiles=(50, 95, 100),
+            )
+        self.assertEqual((whole_day['calls'], whole_day['errors']), (100, 1))
+        self.assertTrue(0.025 <= whole_day['percentiles'][50] <= 0.05)
+        self.assertTrue(0.5 <= whole_day['percentiles'][95] <= 1.0)
+        self.assertEqual(whole_day['percentiles'][100], 5.0)
+
+        # A ragged range mixes minute, hour and day buckets without double counting
+        ragged = latency_percentiles('twitter', day - timedelta(minutes=7), day + timedelta(hours=20, minutes=1))
+        self.assertEqual(ragged['calls'], 99)
+        self.assertEqual(latency_percentiles('twitter', day, day)['calls'], 0)
+
+    def test_ids_in_the_path_share_one_bucket_row(self):
+        moment = datetime(2026, 10, 5, 9, tzinfo=dt_timezone.utc)
+        self._log(moment, 0.1, endpoint='tweets/123')
+        self._log(moment, 0.2, endpoint='/tweets/456')
+        self.sink.flush()
+
+        self.assertEqual(list(APICallRollup.objects.filter(granularity='day').values_list('endpoint', 'count')),
+                         [('tweets/:id', 2.0)])
+        self.assertEqual(latency_percentiles('twitter', moment, moment + timedelta(hours=1), endpoint='tweets/789')['calls'], 2)
+
+
+class APILogPrunerTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user('quinn', password='pw')
+        self.accounts = [
+            TokenManager.store_tokens(
+                self.user, platform, 'prune-access', expires_in=3600, user_data={'id': f'18-{platform}'},
+            )
+            for platform in ('twitter', 'linkedin')
+        ]
+        self.now = timezone.now()
+
+    def _logs(self, account, count, age):
+        APICallLog.objects.bulk_create([
+            APICallLog(
+                user=self.user, social_account=account, endpoint='users/me', method='GET', status_code=200,
+                response_time=0.1, created_at=self.now - age,
+            )
+            for _ in range(count)
+        ])
+
+    def test_deletes_expired_rows_in_chunks(self):
+        for account in self.accounts:
+            self._logs(account, 7, timedelta(days=40))
+            self._logs(account, 2, timedelta(days=1))
+        APICallRollup.objects.create(
+            granularity='minute', bucket_start=self.now - timedelta(days=10), platform='twitter',
+            endpoint='users/me', status_class='2xx',
+        )
+        APICallRollup.objects.create(
+            granularity='day', bucket_start=self.now - timedelta(days=400), platform='twitter',
+            endpoint='users/me', status_class='2xx',
+        )
+
+        stats = APILogPruner(older_than=timedelta(days=30), chunk_size=3, pause=0).run(now=self.now)
+
+        self.assertEqual((stats['deleted'], stats['accounts'], stats['chunks']), (14, 2, 6))
+        self.assertEqual(APICallLog.objects.count(), 4)
+        self.assertFalse(APICallLog.objects.filter(created_at__lt=self.now - timedelta(days=30)).exists())
+        self.assertEqual(stats['rollups_deleted'], 1)
+        self.assertEqual(list(APICallRollup.objects.values_list('granularity', flat=True)), ['day'])
+
+    def test_chunks_are_selected_through_account_index(self):
+        plan = (
+            APICallLog.objects
+            .filter(social_account_id=self.accounts[0].id, created_at__lt=self.now)
+            .order_by('created_at')
+            .values_list('pk', flat=True)
+            .explain()
+        )
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_command_reports_throughput(self):
+        self._logs(self.accounts[0], 3, timedelta(days=60))
+        out = StringIO()
+        call_command('prune_api_logs', days=30, pause=0, stdout=out)
+        self.assertIn('Deleted 3 API log rows', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+
+class TelemetryRouterTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_superuser('rosa', 'rosa@example.com', 'pw')
+        self.account = TokenManager.store_tokens(
+            self.user, 'twitter', 'routed-access', expires_in=3600, user_data={'id': '19', 'username': 'rosa_t'},
+        )
+        self.log = APICallLog.objects.create(
+            user=self.user, social_account=self.account, endpoint='users/me', method='GET',
+            status_code=200, response_time=0.1,
+        )
+
+    def test_telemetry_models_are_routed_to_their_own_database(self):
+        router = TelemetryRouter()
+        self.assertEqual(self.log._state.db, 'telemetry')
+        self.assertEqual(router.db_for_write(APICallRollup), 'telemetry')
+        self.assertIsNone(router.db_for_write(SocialMediaAccount))
+        self.assertTrue(router.allow_migrate('telemetry', 'accounts', model_name='apicalllog'))
+        self.assertFalse(router.allow_migrate('default', 'accounts', model_name='apicalllog'))
+        self.assertFalse(router.allow_migrate('telemetry', 'auth', model_name='user'))
+        self.assertNotIn('accounts_apicalllog', connection.introspection.table_names())
+
+    def test_deleting_accounts_and_users_removes_their_logs(self):
+        self.assertEqual(self.account.api_calls.get(), self.log)
+        self.account.delete()
+        self.assertFalse(APICallLog.objects.exists())
+
+        APICallLog.objects.create(
+            user=self.user, social_account_id=12345, endpoint='users/me', method='GET', status_code=200, response_time=0.1,
+        )
+        self.user.delete()
+        self.assertFalse(APICallLog.objects.exists())
+
+    def test_admin_filters_and_searches_across_databases(self):
+        self.client.force_login(self.user)
+        url = '/admin/accounts/apicalllog/'
+        for query in ('', '?platform=twitter', '?q=rosa_t', '?platform=linkedin'):
+            response = self.client.get(url + query)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['cl'].result_count, 0 if 'linkedin' in query else 1)
+
+
+class StatelessOAuthStateTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('noor', 'noor@example.com', 'pw')
+
+    def test_signed_state_round_trip_touches_no_database(self):
+        with self.settings(OAUTH_STATE={'MODE': 'signed'}), self.assertNumQueries(0):
+            issued = SessionManager.create_oauth_session(
+                self.user, 'twitter', settings.TWITTER_REDIRECT_URI, code_verifier='pkce-verifier-123',
+            )
+            loaded = SessionManager.get_oauth_session(issued.oauth_state)
+            loaded.delete()
+        self.assertNotIn('pkce-verifier-123', issued.oauth_state)
+        self.assertEqual((loaded.user_id, loaded.platform, loaded.code_verifier), (self.user.id, 'twitter', 'pkce-verifier-123'))
+        self.assertFalse(SessionData.objects.exists())
+
+    def test_tampered_or_expired_signed_state_is_rejected(self):
+        with self.settings(OAUTH_STATE={'MODE': 'signed'}):
+            state = SessionManager.create_oauth_session(self.user, 'linkedin', settings.LINKEDIN_REDIRECT_URI).oauth_state
+            self.assertIsNone(SessionManager.get_oauth_session(state[:-2] + 'xx'))
+        with self.settings(OAUTH_STATE={'MODE': 'signed', 'MAX_AGE': -1}):
+            self.assertIsNone(SessionManager.get_oauth_session(state))
+
+    def test_cache_state_is_forgotten_once_deleted(self):
+        with self.settings(OAUTH_STATE={'MODE': 'cache'}):
+            with self.assertNumQueries(0):
+                issued = SessionManager.create_oauth_session(
+                    self.user, 'twitter', settings.TWITTER_REDIRECT_URI, code_verifier='pkce-verifier-456',
+                )
+                loaded = SessionManager.get_oauth_session(issued.oauth_state)
+            self.assertEqual(loaded.code_verifier, 'pkce-verifier-456')
+            loaded.delete()
+            self.assertIsNone(SessionManager.get_oauth_session(issued.oauth_state))
+
+    def test_database_mode_replaces_the_users_previous_login(self):
+        first = SessionManager.create_oauth_session(self.user, 'twitter', settings.TWITTER_REDIRECT_URI)
+        second = SessionManager.create_oauth_session(self.user, 'twitter', settings.TWITTER_REDIRECT_URI)
+        self.assertIsNone(SessionManager.get_oauth_session(first.oauth_state))
+        self.assertEqual(SessionManager.get_oauth_session(second.oauth_state), second)
+
+
+class SessionDataPlatformTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('ines', 'ines@example.com', 'pw')
+
+    def test_platform_cleanup_uses_the_user_platform_index(self):
+        twitter = SessionManager.create_oauth_session(self.user, 'twitter', settings.TWITTER_REDIRECT_URI)
+        linkedin = SessionManager.create_oauth_session(self.user, 'linkedin', settings.LINKEDIN_REDIRECT_URI)
+        self.assertEqual(twitter.platform, 'twitter')
+
+        plan = SessionData.objects.filter(user=self.user, platform='twitter').explain()
+        self.assertIn('USING INDEX accounts_se_user_id_3376ce_idx', plan)
+
+        SessionManager.cleanup_user_platform_sessions(self.user, 'twitter')
+        self.assertEqual(list(SessionData.objects.all()), [linkedin])
+
+    def test_migration_backfills_platform_from_temp_data(self):
+        from django.apps import apps
+        migration = importlib.import_module('accounts.migrations.0008_sessiondata_platform')
+        expires_at = timezone.now() + timedelta(minutes=5)
+        legacy = SessionData.objects.create(user=self.user, temp_data={'platform': 'linkedin'}, expires_at=expires_at)
+        blank = SessionData.objects.create(user=self.user, expires_at=expires_at)
+
+        migration.backfill_platform(apps, mock.Mock(connection=connection))
+        legacy.refresh_from_db()
+        blank.refresh_from_db()
+        self.assertEqual((legacy.platform, blank.platform), ('linkedin', ''))
+
+
+class ConsumeOAuthSessionTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('tariq', 'tariq@example.com', 'pw')
+        self.session = SessionManager.create_oauth_session(
+            self.user, 'twitter', settings.TWITTER_REDIRECT_URI, code_verifier='pkce-verifier-789',
+        )
+
+    def test_consume_returns_and_deletes_in_one_query(self):
+        with self.assertNumQueries(1):
+            consumed = SessionManager.consume_oauth_session(self.session.oauth_state, self.user)
+        self.assertEqual((consumed.pk, consumed.code_verifier, consumed.platform), (self.session.pk, 'pkce-verifier-789', 'twitter'))
+        self.assertIsNone(SessionManager.consume_oauth_session(self.session.oauth_state, self.user))
+        self.assertFalse(SessionData.objects.exists())
+
+    def test_expired_or_foreign_states_are_not_consumed(self):
+        intruder = User.objects.create_user('intruder', 'intruder@example.com', 'pw')
+        self.assertIsNone(SessionManager.consume_oauth_session(self.session.oauth_state, intruder))
+        SessionData.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(SessionManager.consume_oauth_session(self.session.oauth_state, self.user))
+        self.assertTrue(SessionData.objects.exists())
+
+    def test_fallback_without_returning_consumes_once(self):
+        with mock.patch.object(connection.features, 'can_return_columns_from_insert', False):
+            consumed = SessionManager.consume_oauth_session(self.session.oauth_state, self.user)
+            self.assertEqual(consumed.code_verifier, 'pkce-verifier-789')
+            self.assertIsNone(SessionManager.consume_oauth_session(self.session.oauth_state, self.user))
+
+    def test_cache_state_is_consumed_once(self):
+        with self.settings(OAUTH_STATE={'MODE': 'cache'}):
+            state = SessionManager.create_oauth_session(self.user, 'linkedin', settings.LINKEDIN_REDIRECT_URI).oauth_state
+            self.assertIsNotNone(SessionManager.consume_oauth_session(state, self.user))
+            self.assertIsNone(SessionManager.consume_oauth_session(state, self.user))
+
+    def test_replayed_callback_fails_before_contacting_the_provider(self):
+        self.client.force_login(self.user)
+        url = f'/auth/twitter/callback/?code=abc&state={self.session.oauth_state}'
+        with mock.patch('twitter.views.transport.post', return_value=httpx.Response(400)) as post:
+            self.client.get(url)
+            self.client.get(url)
+        self.assertEqual(post.call_count, 1)
+
+
+class ExpiredSessionSweeperTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('mika', 'mika@example.com', 'pw')
+        self.now = timezone.now()
+        for minutes in (-30, -20, -10, 10):
+            SessionData.objects.create(user=self.user, platform='twitter', expires_at=self.now + timedelta(minutes=minutes))
+        for key, minutes in (('stale-a', -5), ('stale-b', -1), ('live', 60)):
+            Session.objects.create(session_key=key, session_data='', expire_date=self.now + timedelta(minutes=minutes))
+
+    def test_sweeps_expired_rows_in_batches(self):
+        stats = ExpiredSessionSweeper(batch_size=2, pause=0).run(now=self.now)
+        self.assertEqual((stats['session_data'], stats['django_sessions'], stats['batches']), (3, 2, 3))
+        self.assertEqual(SessionData.objects.count(), 1)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+    def test_batches_are_selected_through_the_expiry_index(self):
+        plan = SessionData.objects.filter(expires_at__lt=self.now).order_by('expires_at').values_list('pk').explain()
+        self.assertIn('USING COVERING INDEX accounts_se_expires_90eb74_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_logins_do_not_start_a_sweep_thread_unless_configured(self):
+        sweeper = ExpiredSessionSweeper.from_settings()
+        with mock.patch('accounts.utils.session_sweeper', sweeper):
+            SessionManager.create_oauth_session(self.user, 'twitter', 'https://example.com/cb')
+        self.assertIsNone(sweeper._thread)
+
+    def test_command_reports_counts_and_timing(self):
+        out = StringIO()
+        call_command('sweep_expired_sessions', '--batch-size', '10', '--pause', '0', stdout=out)
+        self.assertIn('Deleted 3 expired OAuth sessions and 2 expired Django sessions in 2 batches', out.getvalue())
+        self.assertIn('rows/s', out.getvalue())
+
+
+class AccountPurgerTests(TestCase):
+
+    databases = {'default', 'telemetry'}
+
+    def setUp(self):
+        token_cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user('dara', 'dara@example.com', 'pw')
+        self.account = TokenManager.store_tokens(self.user, 'twitter', 'purge-me', user_data={'id': '7', 'username': 'dara_t'})
+        self.other = TokenManager.store_tokens(self.user, 'linkedin', 'keep-me', user_data={'id': '8', 'username': 'dara_l'})
+        now = timezone.now()
+        for account in (self.account, self.other):
+            Tweet.objects.bulk_create(
+                Tweet(social_account=account, tweet_id=f'{account.pk}-{n}', text='hi', published_at=now) for n in range(5)
+            )
+            TwitterFollower.objects.bulk_create(
+                TwitterFollower(social_account=account, follower_id=str(n), username=f'f{n}', followed_at=now) for n in range(3)
+            )
+            APICallLog.objects.bulk_create(
+                APICallLog(user=self.user, social_account=account, endpoint='users/me', method='GET', status_code=200,
+                           response_time=0.1) for _ in range(4)
+            )
+        UserAnalytics.objects.create(user=self.user, social_account=self.account, date=now.date())
+
+    def test_purge_deletes_only_the_accounts_rows_in_chunks(self):
+        stats = AccountPurger(chunk_size=2).purge(self.account)
+        self.assertEqual(stats['deleted'], {
+            'twitter.Tweet': 5, 'twitter.TwitterFollower': 3, 'accounts.APICallLog': 4, 'accounts.UserAnalytics': 1,
+        })
+        # 3 + 2 + 2 + 1 chunks
+        self.assertEqual(stats['chunks'], 8)
+        self.assertFalse(Tweet.objects.filter(social_account=self.account).exists())
+        self.assertEqual(Tweet.objects.filter(social_account=self.other).count(), 5)
+        self.assertEqual(APICallLog.objects.filter(social_account=self.other).count(), 4)
+
+    def test_only_cascading_relations_are_purged(self):
+        cascading = SocialMediaAccount._meta.related_objects[0]
+        nulled = mock.Mock(related_model=Tweet, field=mock.Mock(concrete=True))
+        nulled.field.remote_field.on_delete = models.SET_NULL
+        with mock.patch.object(SocialMediaAccount._meta, 'related_objects', [cascading, nulled]):
+            self.assertEqual(AccountPurger.dependent_fields(), [(cascading.related_model, cascading.field)])
+
+    def test_disconnect_purges_and_deletes_the_account(self):
+        with mock.patch.object(TokenManager, '_revoke_platform_token'):
+            self.assertTrue(TokenManager.disconnect_account(self.user, 'twitter'))
+        self.assertEqual(list(SocialMediaAccount.objects.all()), [self.other])
+        self.assertEqual(Tweet.objects.count(), 5)
+        self.assertEqual(APICallLog.objects.count(), 4)
+
+    def test_disconnect_flushes_buffered_log_rows_before_purging(self):
+        self.addCleanup(api_log_sink.flush)
+        api_log_sink.submit(APICallLog(user=self.user, social_account=self.account, endpoint='users/me', method='GET',
+                                       status_code=200, response_time=0.1))
+        with mock.patch.object(TokenManager, '_revoke_platform_token'):
+            self.assertTrue(TokenManager.disconnect_account(self.user, 'twitter'))
+        api_log_sink.flush()
+        self.assertFalse(APICallLog.objects.filter(social_account_id=self.account.pk).exists())
@@ -0,0 +1,82 @@
+"""
+Process-local cache of decrypted OAuth access tokens
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class DecryptedTokenCache:
+    """Bounded LRU of decrypted tokens keyed on (account id, expiry, ciphertext hash)"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._keys_by_account = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(social_account):
+        """Build the cache key for the account's current stored token"""
+        ciphertext = social_account.access_token or ''
+        digest = hashlib.blake2b(ciphertext.encode(), digest_size=16).digest()
+        return (social_account.id, social_account.token_expires_at, digest)
+
+    def get(self, social_account):
+        """Return the cached plaintext token, or None on a miss or after expiry"""
+        if social_account.id is None:
+            return None
+        key = self.make_key(social_account)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, deadline = entry
+            if deadline is not None and time.time() >= deadline:
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, social_account, token):
+        """Cache a decrypted token until the account's token expires"""
+        if social_account.id is None or not token:
+            return
+        key = self.make_key(social_account)
+        expires_at = social_account.token_expires_at
+        deadline = expires_at.timestamp() if expires_at else None
+        with self._lock:
+            self._entries[key] = (token, deadline)
+            self._entries.move_to_end(key)
+            self._keys_by_account.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._discard(oldest_key)
+
+    def invalidate(self, account_id):
+        """Drop every cached token for an account"""
+        with self._lock:
+            for key in self._keys_by_account.pop(account_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_account.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        account_keys = self._keys_by_account.get(key[0])
+        if account_keys is not None:
+            account_keys.discard(key)
+            if not account_keys:
+                del self._keys_by_account[key[0]]
+
+
+token_cache = DecryptedTokenCache(max_entries=getattr(settings, 'TOKEN_CACHE_MAX_ENTRIES', 1024))
@@ -0,0 +1,125 @@
+"""
+Proactive refresh of access tokens that are about to expire
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.utils import timezone
+
+from accounts import refresh_lock
+from accounts.models import SocialMediaAccount
+from accounts.token_cache import token_cache
+from accounts.utils import TokenManager
+
+
+class TokenRefreshSweeper:
+    """Refresh tokens expiring within a lookahead window, in batches"""
+
+    def __init__(self, lookahead=timedelta(minutes=15), batch_size=100, max_workers=8):
+        self.lookahead = lookahead
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+    def expiring_accounts(self, now=None):
+        """Active, refreshable accounts whose token expires before now + lookahead"""
+        now = now or timezone.now()
+        return (
+            SocialMediaAccount.objects
+            .filter(
+                status='active',
+                platform__in=TokenManager.REFRESHABLE_PLATFORMS,
+                token_expires_at__isnull=False,
+                token_expires_at__lte=now + self.lookahead,
+            )
+            .exclude(refresh_token__isnull=True)
+            .exclude(refresh_token='')
+            .order_by('pk')
+        )
+
+    def run(self):
+        """Sweep all expiring accounts and return refresh statistics"""
+        stats = {'scanned': 0, 'refreshed': 0, 'failed': 0, 'expired': 0, 'skipped': 0}
+        now = timezone.now()
+        queryset = self.expiring_accounts(now)
+        last_pk = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                batch = list(queryset.filter(pk__gt=last_pk)[:self.batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                self._refresh_batch(batch, executor, stats)
+
+        return stats
+
+    def _refresh_batch(self, batch, executor, stats):
+        stats['scanned'] += len(batch)
+        pending = iter(batch)
+        in_flight = {}
+
+        # Lease an account only when a worker is free to refresh it, so each lease
+        # covers one refresh request rather than the whole batch
+        while True:
+            while len(in_flight) < self.max_workers:
+                social_account = next(pending, None)
+                if social_account is None:
+                    break
+                lease = self._lease(social_account, stats)
+                if lease:
+                    future = executor.submit(TokenManager.request_token_refresh, social_account)
+                    in_flight[future] = (social_account, lease)
+            if not in_flight:
+                return
+
+            # Only the HTTP round-trips run on the pool; all DB writes stay here
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                social_account, lease = in_flight.pop(future)
+                try:
+                    self._apply(social_account, lease, future.result(), stats)
+                finally:
+                    refresh_lock.release_refresh_lease(social_account.pk, lease)
+
+    def _lease(self, social_account, stats):
+        """Claim the account's refresh lease and re-read it; None if it should be skipped"""
+        now = timezone.now()
+        # Skip accounts a request is already refreshing on demand
+        lease = refresh_lock.acquire_refresh_lease(social_account.pk, now)
+        if not lease:
+            stats['skipped'] += 1
+            return None
+
+        # Re-read under the lease: the previous holder may have refreshed already
+        social_account.refresh_from_db(fields=TokenManager.REFRESH_UPDATE_FIELDS)
+        expires_at = social_account.token_expires_at
+        if social_account.status != 'active' or not expires_at or expires_at > now + self.lookahead:
+            refresh_lock.release_refresh_lease(social_account.pk, lease)
+            stats['skipped'] += 1
+            return None
+        return lease
+
+    def _apply(self, social_account, lease, token_info, stats):
+        """Write one refresh outcome, only while this sweep still holds the account's lease"""
+        now = timezone.now()
+        owned = SocialMediaAccount.objects.filter(pk=social_account.pk, refresh_lease_until=lease)
+        if token_info:
+            TokenManager.apply_refreshed_tokens(social_account, token_info)
+            fields = {name: getattr(social_account, name) for name in TokenManager.REFRESH_UPDATE_FIELDS}
+            outcome, written = 'refreshed', owned.update(**fields)
+        elif social_account.token_expires_at <= now:
+            # Too late to retry on the next sweep; the token is already dead. Unless
+            # someone stored a new one meanwhile, which this write must not clobber
+            outcome, written = 'expired', owned.filter(access_token=social_account.access_token).update(
+                status='expired', updated_at=now,
+            )
+        else:
+            stats['failed'] += 1
+            return
+
+        if not written:
+            print(f"⚠️ Account {social_account.pk} changed hands during its refresh; not overwriting it")
+            stats['skipped'] += 1
+            return
+        token_cache.invalidate(social_account.pk)
+        stats[outcome] += 1
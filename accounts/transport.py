@@ -0,0 +1,143 @@
+"""
+Shared HTTP transport for every outbound platform call
+
+One pooled, keep-alive ``requests.Session`` is kept per platform so calls
+reuse TCP/TLS connections instead of handshaking every time. Sessions
+never store cookies, which keeps them stateless and safe to share across
+threads serving different users.
+
+Async callers get the same per-platform pooling from an ``httpx.AsyncClient``
+per event loop, with a semaphore bounding in-flight calls per platform.
+"""
+import asyncio
+import threading
+import weakref
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TRANSPORT_SETTINGS = {
+    'POOL_CONNECTIONS': 4,  # Distinct hosts kept per platform (api., www., ...)
+    'POOL_MAXSIZE': 32,  # Keep-alive connections kept per host
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 15,
+    'ASYNC_MAX_CONCURRENCY': 100,  # In-flight async calls per platform and event loop
+    'BATCH_MAX_CONCURRENCY': 16,  # In-flight execute_batch() calls per platform and process
+}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_batch_slots = {}
+
+# Event loop -> {platform: (AsyncClient, Semaphore)}; both are bound to their loop
+_async_pools = weakref.WeakKeyDictionary()
+
+
+def transport_settings():
+    """DEFAULT_TRANSPORT_SETTINGS overridden by settings.HTTP_TRANSPORT"""
+    return {**DEFAULT_TRANSPORT_SETTINGS, **getattr(settings, 'HTTP_TRANSPORT', {})}
+
+
+def default_timeout():
+    config = transport_settings()
+    return (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+
+
+def _no_cookies_policy():
+    return DefaultCookiePolicy(allowed_domains=[])
+
+
+def _build_session():
+    config = transport_settings()
+    session = requests.Session()
+    session.cookies.set_policy(_no_cookies_policy())
+    adapter = HTTPAdapter(
+        pool_connections=config['POOL_CONNECTIONS'],
+        pool_maxsize=config['POOL_MAXSIZE'],
+        max_retries=0,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(platform):
+    """Return the shared session for a platform, creating it on first use"""
+    session = _sessions.get(platform)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(platform)
+            if session is None:
+                session = _sessions[platform] = _build_session()
+    return session
+
+
+def request(platform, method, url, **kwargs):
+    """Send a request through the platform's pooled session with default timeouts"""
+    kwargs.setdefault('timeout', default_timeout())
+    return get_session(platform).request(method, url, **kwargs)
+
+
+def get(platform, url, **kwargs):
+    return request(platform, 'GET', url, **kwargs)
+
+
+def post(platform, url, **kwargs):
+    return request(platform, 'POST', url, **kwargs)
+
+
+def batch_slots(platform):
+    """Semaphore capping concurrent batch calls to a platform across all batches in this process"""
+    with _sessions_lock:
+        slots = _batch_slots.get(platform)
+        if slots is None:
+            slots = _batch_slots[platform] = threading.BoundedSemaphore(transport_settings()['BATCH_MAX_CONCURRENCY'])
+    return slots
+
+
+def close_sessions():
+    """Close every pooled session (tests and process shutdown)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def _build_async_pool():
+    config = transport_settings()
+    limits = httpx.Limits(
+        max_connections=config['ASYNC_MAX_CONCURRENCY'],
+        max_keepalive_connections=config['POOL_MAXSIZE'],
+    )
+    timeout = httpx.Timeout(config['READ_TIMEOUT'], connect=config['CONNECT_TIMEOUT'])
+    client = httpx.AsyncClient(limits=limits, timeout=timeout, cookies=CookieJar(policy=_no_cookies_policy()))
+    return client, asyncio.Semaphore(config['ASYNC_MAX_CONCURRENCY'])
+
+
+def get_async_pool(platform):
+    """Return the (AsyncClient, Semaphore) pair for a platform on the running loop"""
+    loop = asyncio.get_running_loop()
+    pools = _async_pools.get(loop)
+    if pools is None:
+        pools = _async_pools[loop] = {}
+    pool = pools.get(platform)
+    if pool is None:
+        pool = pools[platform] = _build_async_pool()
+    return pool
+
+
+async def arequest(platform, method, url, **kwargs):
+    """Async counterpart of request(), bounded per platform"""
+    client, semaphore = get_async_pool(platform)
+    async with semaphore:
+        return await client.request(method, url, **kwargs)
+
+
+async def aclose_sessions():
+    """Close the async clients bound to the running loop"""
+    pools = _async_pools.pop(asyncio.get_running_loop(), {})
+    for client, _ in pools.values():
+        await client.aclose()
@@ -2,53 +2,85 @@
 Utility functions for social media integrations
 """
 import base64
+import copy
 import json
 import hashlib
 import secrets
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.utils import timezone
 from django.conf import settings
+from django.db import connections, router, transaction
 from accounts.models import SocialMediaAccount, APICallLog, SessionData
+from accounts.circuit import CircuitBreaker
+from accounts.crypto import TokenCipher
+from accounts.log_sampling import LogSampler
+from accounts.log_sink import api_log_sink
+from accounts.oauth_state import oauth_state_settings, stateless_store
+from accounts.coalesce import inflight_requests, request_key
+from accounts.ratelimit import RateLimiter, RateLimitExceeded, parse_rate_limit_headers
+from accounts.response_cache import response_cache
+from accounts.purge import AccountPurger
+from accounts.retry import RetryPolicy
+from accounts.session_sweeper import session_sweeper
+from accounts.token_cache import token_cache
+from accounts import batch, refresh_lock, transport
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 
 class TokenManager:
     """Manage OAuth tokens securely"""
     
+    # Platforms whose OAuth flow hands out refresh tokens we know how to use
+    REFRESHABLE_PLATFORMS = ('twitter',)
+    
+    # Columns rewritten whenever tokens are stored for an existing account
+    TOKEN_UPSERT_FIELDS = [
+        'access_token', 'refresh_token', 'token_expires_at', 'scope',
+        'status', 'last_sync', 'extra_data', 'updated_at',
+    ]
+    
+    # Account column -> user_data key for profile fields
+    PROFILE_FIELD_KEYS = {
+        'username': 'username',
+        'display_name': 'name',
+        'email': 'email',
+        'profile_url': 'profile_url',
+        'avatar_url': 'avatar_url',
+    }
+    
+    # Columns touched by a token refresh
+    REFRESH_UPDATE_FIELDS = ['access_token', 'refresh_token', 'token_expires_at', 'scope', 'status', 'updated_at']
+    
     @staticmethod
     def encrypt_token(token):
-        """Simple token encryption using Django's SECRET_KEY"""
-        if not token:
-            return ""
-        
-        # Use Django's SECRET_KEY for encryption
-        key = settings.SECRET_KEY.encode()
-        token_bytes = token.encode()
-        
-        # Simple XOR encryption (for production, use proper encryption)
-        encrypted = bytes(a ^ b for a, b in zip(token_bytes, key * (len(token_bytes) // len(key) + 1)))
-        return base64.b64encode(encrypted).decode()
+        """Encrypt a token with the cached AES-GCM cipher"""
+        return TokenCipher.encrypt(token)
     
     @staticmethod
     def decrypt_token(encrypted_token):
         """Decrypt token"""
-        if not encrypted_token:
-            return ""
-        
-        try:
-            key = settings.SECRET_KEY.encode()
-            encrypted_bytes = base64.b64decode(encrypted_token.encode())
-            
-            # Decrypt using XOR
-            decrypted = bytes(a ^ b for a, b in zip(encrypted_bytes, key * (len(encrypted_bytes) // len(key) + 1)))
-            return decrypted.decode()
-        except Exception:
-            return ""
+        return TokenCipher.decrypt(encrypted_token)
+    
+    @staticmethod
+    def encrypt_many(tokens):
+        """Encrypt a batch of tokens (bulk refresh and re-encryption jobs)"""
+        return TokenCipher.encrypt_many(tokens)
+    
+    @staticmethod
+    def decrypt_many(encrypted_tokens):
+        """Decrypt a batch of tokens (bulk refresh and re-encryption jobs)"""
+        return TokenCipher.decrypt_many(encrypted_tokens)
     
     @staticmethod
     def store_tokens(user, platform, access_token, refresh_token=None, expires_in=None, scope=None, user_data=None):
-        """Store OAuth tokens for a user"""
+        """Store OAuth tokens for a user
+        
+        user_data must be the platform's full profile payload. On conflict it
+        replaces the stored extra_data instead of being merged into it, so any
+        key it leaves out is dropped from the account.
+        """
         
         # Calculate expiration time
         expires_at = None
@@ -60,51 +92,53 @@ class TokenManager:
             raise ValueError(f"Missing user_data or platform user ID for {platform}")
         
         platform_user_id = str(user_data.get('id'))
+        now = timezone.now()
         
-        # Get or create social media account - use more specific matching
-        try:
-            # First try to get existing account for this specific user and platform
-            social_account = SocialMediaAccount.objects.get(
-                user=user,
-                platform=platform,
-                platform_user_id=platform_user_id
-            )
-            # Update existing account
-            social_account.username = user_data.get('username', social_account.username)
-            social_account.display_name = user_data.get('name', social_account.display_name)
-            social_account.email = user_data.get('email', social_account.email)
-            social_account.profile_url = user_data.get('profile_url', social_account.profile_url)
-            social_account.avatar_url = user_data.get('avatar_url', social_account.avatar_url)
-            social_account.access_token = TokenManager.encrypt_token(access_token)
-            social_account.refresh_token = TokenManager.encrypt_token(refresh_token) if refresh_token else ''
-            social_account.token_expires_at = expires_at
-            social_account.scope = scope or ''
-            social_account.status = 'active'
-            social_account.last_sync = timezone.now()
-            social_account.extra_data.update(user_data)
-            social_account.save()
-            
-        except SocialMediaAccount.DoesNotExist:
-            # Create new account
-            social_account = SocialMediaAccount.objects.create(
-                user=user,
-                platform=platform,
-                platform_user_id=platform_user_id,
-                username=user_data.get('username', ''),
-                display_name=user_data.get('name', ''),
-                email=user_data.get('email', ''),
-                profile_url=user_data.get('profile_url', ''),
-                avatar_url=user_data.get('avatar_url', ''),
-                access_token=TokenManager.encrypt_token(access_token),
-                refresh_token=TokenManager.encrypt_token(refresh_token) if refresh_token else '',
-                token_expires_at=expires_at,
-                scope=scope or '',
-                status='active',
-                extra_data=user_data
-            )
+        social_account = SocialMediaAccount(
+            user=user,
+            platform=platform,
+            platform_user_id=platform_user_id,
+            access_token=TokenManager.encrypt_token(access_token),
+            refresh_token=TokenManager.encrypt_token(refresh_token) if refresh_token else '',
+            token_expires_at=expires_at,
+            scope=scope or '',
+            status='active',
+            last_sync=now,
+            extra_data=user_data,
+        )
         
+        # Profile columns are only overwritten when the platform sent a value for them
+        update_fields = list(TokenManager.TOKEN_UPSERT_FIELDS)
+        for field_name, key in TokenManager.PROFILE_FIELD_KEYS.items():
+            setattr(social_account, field_name, user_data.get(key, ''))
+            if key in user_data:
+                update_fields.append(field_name)
+        
+        TokenManager.upsert_accounts([social_account], update_fields)
         return social_account
     
+    @staticmethod
+    def upsert_accounts(social_accounts, update_fields, batch_size=500):
+        """Insert or update accounts in one INSERT ... ON CONFLICT statement per batch
+        
+        Rows are matched on (user, platform, platform_user_id); on conflict only
+        ``update_fields`` are written. The instances get their primary keys back,
+        but any column outside ``update_fields`` keeps its in-memory value, so
+        reload an instance before relying on counters or timestamps. JSON
+        columns such as ``extra_data`` are overwritten whole, not merged.
+        """
+        SocialMediaAccount.objects.bulk_create(
+            social_accounts,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user', 'platform', 'platform_user_id'],
+            update_fields=update_fields,
+        )
+        
+        for social_account in social_accounts:
+            token_cache.invalidate(social_account.id)
+        return social_accounts
+    
     @staticmethod
     def disconnect_account(user, platform):
         """Disconnect a social media account for a user"""
@@ -119,56 +153,22 @@ class TokenManager:
             # Revoke tokens on the platform side before local cleanup
             TokenManager._revoke_platform_token(social_account, platform)
             
-            # Delete related data first (cascading will handle some, but we'll be explicit)
-            from accounts.models import APICallLog, UserAnalytics, SessionData
+            # Write out buffered log rows first, or they would land after the purge as orphans
+            api_log_sink.flush()
             
-            # Clean up API call logs
-            api_logs_deleted = APICallLog.objects.filter(social_account=social_account).count()
-            APICallLog.objects.filter(social_account=social_account).delete()
-            print(f"🗑️ Deleted {api_logs_deleted} API call logs")
-            
-            # Clean up analytics data
-            analytics_deleted = UserAnalytics.objects.filter(social_account=social_account).count()
-            UserAnalytics.objects.filter(social_account=social_account).delete()
-            print(f"📊 Deleted {analytics_deleted} analytics records")
-            
-            # Clean up session data
-            session_data_deleted = SessionData.objects.filter(social_account=social_account).count()
-            SessionData.objects.filter(social_account=social_account).delete()
-            print(f"🔑 Deleted {session_data_deleted} session records")
+            # Delete related data in small chunks first, so the account delete below has nothing to cascade
+            stats = AccountPurger().purge(social_account)
+            for label, deleted in stats['deleted'].items():
+                print(f"🗑️ Deleted {deleted} {label} rows")
+            print(f"🧹 Purged {sum(stats['deleted'].values())} rows in {stats['chunks']} chunks ({stats['elapsed']:.2f}s)")
             
             # Clean up platform-specific sessions
             SessionManager.cleanup_user_platform_sessions(user, platform)
             
-            # Delete platform-specific profile data
-            if platform == 'linkedin':
-                try:
-                    from linkedIn.models import LinkedInProfile
-                    linkedin_profiles_deleted = LinkedInProfile.objects.filter(social_account=social_account).count()
-                    LinkedInProfile.objects.filter(social_account=social_account).delete()
-                    print(f"💼 Deleted {linkedin_profiles_deleted} LinkedIn profiles")
-                except ImportError:
-                    print("⚠️ LinkedIn models not available")
-            elif platform == 'twitter':
-                try:
-                    from twitter.models import TwitterProfile, Tweet, TwitterFollower, TwitterHashtag
-                    twitter_profiles_deleted = TwitterProfile.objects.filter(social_account=social_account).count()
-                    tweets_deleted = Tweet.objects.filter(social_account=social_account).count()
-                    followers_deleted = TwitterFollower.objects.filter(social_account=social_account).count()
-                    hashtags_deleted = TwitterHashtag.objects.filter(social_account=social_account).count()
-                    
-                    TwitterProfile.objects.filter(social_account=social_account).delete()
-                    Tweet.objects.filter(social_account=social_account).delete()
-                    TwitterFollower.objects.filter(social_account=social_account).delete()
-                    TwitterHashtag.objects.filter(social_account=social_account).delete()
-                    
-                    print(f"🐦 Deleted {twitter_profiles_deleted} profiles, {tweets_deleted} tweets, {followers_deleted} followers, {hashtags_deleted} hashtags")
-                except ImportError:
-                    print("⚠️ Twitter models not available")
-            
             # Finally, delete the social media account
             account_id = social_account.id
             social_account.delete()
+            token_cache.invalidate(account_id)
             print(f"✅ Successfully deleted social media account {account_id}")
             
             return True
@@ -196,7 +196,7 @@ class TokenManager:
                     'client_id': settings.LINKEDIN_CLIENT_ID,
                     'client_secret': settings.LINKEDIN_CLIENT_SECRET
                 }
-                response = requests.post(revoke_url, data=data)
+                response = transport.post('linkedin', revoke_url, data=data)
                 if response.status_code == 200:
                     print(f"✅ Successfully revoked LinkedIn token")
                 else:
@@ -216,7 +216,7 @@ class TokenManager:
                     'Authorization': f'Basic {encoded_credentials}',
                     'Content-Type': 'application/x-www-form-urlencoded'
                 }
-                response = requests.post(revoke_url, data=data, headers=headers)
+                response = transport.post('twitter', revoke_url, data=data, headers=headers)
                 if response.status_code == 200:
                     print(f"✅ Successfully revoked Twitter token")
                 else:
@@ -241,35 +241,149 @@ class TokenManager:
     def get_valid_token(social_account):
         """Get a valid access token, refreshing if necessary"""
         
+        # Cached entries are dropped at expiry, so a hit needs no expiry re-check
+        cached_token = token_cache.get(social_account)
+        if cached_token is not None:
+            return cached_token
+        
         # Check if token is expired
         if social_account.is_token_expired():
-            # Try to refresh token
+            token_cache.invalidate(social_account.id)
+            
+            # Try to refresh token (exactly one caller refreshes, the rest reuse its result)
             if social_account.refresh_token:
-                new_tokens = TokenManager.refresh_access_token(social_account)
-                if new_tokens:
-                    return TokenManager.decrypt_token(social_account.access_token)
+                return TokenManager._refresh_single_flight(social_account)
             
-            # Mark as expired if refresh failed
+            # Mark as expired if there is nothing to refresh with
             social_account.status = 'expired'
-            social_account.save()
+            social_account.save(update_fields=['status', 'updated_at'])
             return None
         
-        return TokenManager.decrypt_token(social_account.access_token)
+        access_token = TokenManager.decrypt_token(social_account.access_token)
+        token_cache.set(social_account, access_token)
+        return access_token
+    
+    @staticmethod
+    def _refresh_single_flight(social_account):
+        """Refresh an expired token once across threads and worker processes"""
+        poll_interval = getattr(settings, 'TOKEN_REFRESH_POLL_SECONDS', 0.05)
+        deadline = time.monotonic() + refresh_lock.lease_duration().total_seconds()
+        
+        with refresh_lock.local_refresh_lock(social_account.id):
+            while True:
+                # Another thread or process may have finished the refresh while we waited
+                social_account.refresh_from_db(fields=TokenManager.REFRESH_UPDATE_FIELDS)
+                if not social_account.is_token_expired():
+                    access_token = TokenManager.decrypt_token(social_account.access_token)
+                    token_cache.set(social_account, access_token)
+                    return access_token
+                if social_account.status != 'active':
+                    return None
+                
+                lease = refresh_lock.acquire_refresh_lease(social_account.id)
+                if lease:
+                    break
+                
+                if time.monotonic() >= deadline:
+                    print(f"⚠️ Timed out waiting for token refresh of account {social_account.id}")
+                    return None
+                time.sleep(poll_interval)
+            
+            try:
+                # Re-check under the lease: the previous holder may have just released it
+                social_account.refresh_from_db(fields=TokenManager.REFRESH_UPDATE_FIELDS)
+                if social_account.is_token_expired():
+                    if not TokenManager.refresh_access_token(social_account):
+                        social_account.status = 'expired'
+                        social_account.save(update_fields=['status', 'updated_at'])
+                        return None
+                
+                access_token = TokenManager.decrypt_token(social_account.access_token)
+                token_cache.set(social_account, access_token)
+                return access_token
+            finally:
+                refresh_lock.release_refresh_lease(social_account.id, lease)
     
     @staticmethod
     def refresh_access_token(social_account):
         """Refresh access token using refresh token"""
-        # This is platform-specific and should be implemented for each platform
-        # For now, return None - implement in platform-specific handlers
+        token_info = TokenManager.request_token_refresh(social_account)
+        if not token_info:
+            return None
+        
+        TokenManager.apply_refreshed_tokens(social_account, token_info)
+        social_account.save(update_fields=TokenManager.REFRESH_UPDATE_FIELDS)
+        token_cache.invalidate(social_account.id)
+        return token_info
+    
+    @staticmethod
+    def request_token_refresh(social_account):
+        """Exchange the stored refresh token for new tokens (network only, no DB writes)"""
+        if social_account.platform not in TokenManager.REFRESHABLE_PLATFORMS:
+            return None
+        
+        refresh_token = TokenManager.decrypt_token(social_account.refresh_token)
+        if not refresh_token:
+            return None
+        
+        try:
+            if social_account.platform == 'twitter':
+                # Twitter OAuth 2.0 refresh (requires the offline.access scope)
+                token_url = "https://api.twitter.com/2/oauth2/token"
+                data = {
+                    'grant_type': 'refresh_token',
+                    'refresh_token': refresh_token,
+                    'client_id': settings.TWITTER_CLIENT_ID,
+                }
+                credentials = f"{settings.TWITTER_CLIENT_ID}:{settings.TWITTER_CLIENT_SECRET}"
+                encoded_credentials = base64.b64encode(credentials.encode()).decode()
+                headers = {
+                    'Authorization': f'Basic {encoded_credentials}',
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                }
+                response = transport.post('twitter', token_url, data=data, headers=headers)
+                if response.status_code != 200:
+                    print(f"⚠️ Failed to refresh Twitter token for account {social_account.id}: {response.status_code}")
+                    return None
+                
+                token_info = response.json()
+                if not token_info.get('access_token'):
+                    return None
+                return token_info
+        except Exception as e:
+            print(f"💥 Error refreshing {social_account.platform} token: {str(e)}")
+        
         return None
+    
+    @staticmethod
+    def apply_refreshed_tokens(social_account, token_info):
+        """Copy a refresh response onto the account without saving it"""
+        social_account.access_token = TokenManager.encrypt_token(token_info['access_token'])
+        
+        # Twitter rotates refresh tokens; keep the old one if none was returned
+        if token_info.get('refresh_token'):
+            social_account.refresh_token = TokenManager.encrypt_token(token_info['refresh_token'])
+        
+        expires_in = token_info.get('expires_in')
+        social_account.token_expires_at = timezone.now() + timedelta(seconds=int(expires_in)) if expires_in else None
+        if token_info.get('scope'):
+            social_account.scope = token_info['scope']
+        social_account.status = 'active'
+        social_account.updated_at = timezone.now()
 
 
 class APIClient:
     """Generic API client for social media platforms"""
     
-    def __init__(self, social_account):
+    def __init__(self, social_account, retry_policy=None, rate_limiter=None, cache=None, circuit_breaker=None):
         self.social_account = social_account
         self.base_url = self._get_base_url()
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.response_cache = cache or response_cache
+        self.circuit_breaker = circuit_breaker or CircuitBreaker.from_settings()
+        self.log_sampler = LogSampler.from_settings()
+        self.last_status_code = None  # Lets callers tell a 429 from a 500 after a None result
     
     def _get_base_url(self):
         """Get base URL for the platform's API"""
@@ -281,13 +395,188 @@ class APIClient:
         return urls.get(self.social_account.platform, '')
     
     def make_request(self, endpoint, method='GET', params=None, data=None, headers=None):
-        """Make authenticated API request"""
+        """Make authenticated API request, retrying transient failures"""
+        if method.upper() != 'GET':
+            return self._send_request(endpoint, method, params, data, headers)
+        
+        # Identical concurrent GETs share one outbound call and one log row
+        def send():
+            return self._send_request(endpoint, method, params, data, headers), self.last_status_code
         
-        # Get valid access token
-        access_token = TokenManager.get_valid_token(self.social_account)
+        key = request_key(self.social_account, endpoint, params, headers)
+        result, self.last_status_code = inflight_requests.do(key, send)
+        return result
+    
+    def execute_batch(self, calls, max_concurrency=8):
+        """Run many calls concurrently and return a BatchResult per item, in input order
+        
+        Items are endpoint strings or dicts of make_request() arguments. Calls
+        to the same platform are also capped process-wide by
+        HTTP_TRANSPORT['BATCH_MAX_CONCURRENCY'].
+        """
+        items = [batch.as_request(item) for item in calls]
+        slots = transport.batch_slots(self.social_account.platform)
+        
+        def run(request):
+            # A client per item, so last_status_code is not shared across threads
+            client = copy.copy(self)
+            try:
+                with slots:
+                    data = client.make_request(**request)
+            except Exception as e:
+                return batch.BatchResult(request, status_code=client.last_status_code, error=str(e))
+            return batch.BatchResult.from_response(request, data, client.last_status_code)
+        
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(items)))) as executor:
+            return list(executor.map(run, items))
+    
+    def _send_request(self, endpoint, method, params, data, headers):
+        """Send one logical request: cache lookup, token, retries and logging"""
+        self.last_status_code = None
+        platform = self.social_account.platform
+        
+        # Fresh cached GETs need neither a token nor a round-trip
+        cache, access_token = self._start_request(method, endpoint, params)
+        cached = cache[2]
+        if cached is not None and cached.is_fresh():
+            self.last_status_code = 200
+            return cached.data
         if not access_token:
             return None
         
+        url, params, headers = self._prepare_request(access_token, endpoint, params, headers)
+        if cached is not None:
+            headers.update(cached.conditional_headers())
+        deadline = self.retry_policy.deadline()
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            
+            # Fail fast while the platform is degraded (raises CircuitOpenError), and
+            # hold the call back rather than spend a request on a certain 429
+            try:
+                probe, wait = self._begin_attempt(endpoint)
+                while wait:
+                    time.sleep(wait)
+                    probe, wait = self._begin_attempt(endpoint)
+            except RateLimitExceeded as e:
+                print(f"⏳ Deferred {endpoint} for account {self.social_account.id}: {e}")
+                self.last_status_code = 429
+                return None
+            
+            start_time = time.time()
+            
+            try:
+                if method.upper() in ('GET', 'DELETE'):
+                    response = transport.request(platform, method.upper(), url, params=params, headers=headers)
+                elif method.upper() in ('POST', 'PUT'):
+                    response = transport.request(platform, method.upper(), url, params=params, json=data, headers=headers)
+                else:
+                    raise ValueError(f"Unsupported HTTP method: {method}")
+                
+                response_time = time.time() - start_time
+                self.last_status_code = response.status_code
+                result, delay = self._finish_attempt(endpoint, method, attempt, deadline, cache, probe, response, response_time)
+                if delay is None:
+                    return result
+                
+            except Exception as e:
+                response_time = time.time() - start_time
+                self.last_status_code = 0
+                
+                # Only connection failures and timeouts are worth another attempt
+                transport_error = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                delay = self._fail_attempt(endpoint, method, attempt, deadline, probe, e, transport_error, response_time)
+            
+            if delay is None:
+                return None
+            time.sleep(delay)
+    
+    # The steps around each send are plain synchronous calls, so AsyncAPIClient can
+    # run each group of them in a single sync_to_async() hop
+    
+    def _start_request(self, method, endpoint, params):
+        """Return ((cache key, TTL, cached entry), access token); no token when a fresh copy is cached"""
+        cache = self._cached_response(method, endpoint, params)
+        if cache[2] is not None and cache[2].is_fresh():
+            return cache, None
+        return cache, TokenManager.get_valid_token(self.social_account)
+    
+    def _begin_attempt(self, endpoint):
+        """Circuit and budget checks before one attempt: (is half-open probe, seconds to wait first)"""
+        platform = self.social_account.platform
+        probe = self.circuit_breaker.allow(platform, endpoint)
+        wait = self.rate_limiter.reserve(self.social_account, endpoint)
+        if not wait:
+            return probe, 0
+        
+        # The probe is not sent now; let the next caller take it
+        if probe:
+            self.circuit_breaker.release_probe(platform, endpoint)
+        if wait > self.rate_limiter.max_wait:
+            raise RateLimitExceeded(wait)
+        return False, wait
+    
+    def _finish_attempt(self, endpoint, method, attempt, deadline, cache, probe, response, response_time):
+        """Record a response (budget, breaker, log row, cache); return (result, retry delay or None)"""
+        platform = self.social_account.platform
+        policy = self.retry_policy
+        self.rate_limiter.record(self.social_account, endpoint, response.headers)
+        self.circuit_breaker.record(platform, endpoint, response.status_code, response_time, probe)
+        
+        error_message = ''
+        delay = None
+        if response.status_code not in (200, 304):
+            retryable = policy.is_retryable(method, response.status_code)
+            delay = policy.next_delay(attempt, response.status_code, response.headers, deadline) if retryable else None
+            error_message = policy.describe(response.text, attempt, delay, retryable)
+        
+        # Log API call (exactly one row per attempt)
+        self._log_api_call(endpoint, method, response.status_code, response_time, response.headers,
+                         error_message=error_message, attempt=attempt)
+        
+        cache_key, cache_ttl, cached = cache
+        if response.status_code == 304 and cached is not None:
+            self.response_cache.revalidated(cache_key, cached, response.headers, cache_ttl)
+            return cached.data, None
+        
+        if response.status_code == 200:
+            payload = response.json()
+            if cache_key:
+                self.response_cache.store(cache_key, payload, response.headers, cache_ttl)
+            return payload, None
+        return None, delay
+    
+    def _fail_attempt(self, endpoint, method, attempt, deadline, probe, error, transport_error, response_time):
+        """Record an attempt that got no response; return the retry delay or None"""
+        platform = self.social_account.platform
+        policy = self.retry_policy
+        if transport_error:
+            self.circuit_breaker.record(platform, endpoint, 0, response_time, probe)
+        elif probe:
+            self.circuit_breaker.release_probe(platform, endpoint)
+        retryable = transport_error and policy.is_retryable(method, 0)
+        delay = policy.next_delay(attempt, 0, {}, deadline) if retryable else None
+        self._log_api_call(endpoint, method, 0, response_time, {},
+                         error_message=policy.describe(str(error), attempt, delay, retryable), attempt=attempt)
+        return delay
+    
+    def _cached_response(self, method, endpoint, params):
+        """Return (cache key, TTL, cached entry) for cacheable GETs, else (None, 0, None)"""
+        if method.upper() != 'GET':
+            return None, 0, None
+        cache_ttl = self.response_cache.ttl_for(self.social_account.platform, endpoint)
+        if not cache_ttl:
+            return None, 0, None
+        cache_key = self.response_cache.make_key(self.social_account, endpoint, params)
+        return cache_key, cache_ttl, self.response_cache.get(cache_key)
+    
+    def _prepare_request(self, access_token, endpoint, params, headers):
+        """Build the URL, params and headers for an authenticated call"""
+        
         # Prepare headers
         if headers is None:
             headers = {}
@@ -302,65 +591,38 @@ class APIClient:
                 params = {}
             params['access_token'] = access_token
         
-        # Make request
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        start_time = time.time()
-        
-        try:
-            if method.upper() == 'GET':
-                response = requests.get(url, params=params, headers=headers)
-            elif method.upper() == 'POST':
-                response = requests.post(url, params=params, json=data, headers=headers)
-            elif method.upper() == 'PUT':
-                response = requests.put(url, params=params, json=data, headers=headers)
-            elif method.upper() == 'DELETE':
-                response = requests.delete(url, params=params, headers=headers)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
-            
-            response_time = time.time() - start_time
-            
-            # Log API call
-            self._log_api_call(endpoint, method, response.status_code, response_time, response.headers)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                self._log_api_call(endpoint, method, response.status_code, response_time, 
-                                 response.headers, error_message=response.text)
-                return None
-                
-        except Exception as e:
-            response_time = time.time() - start_time
-            self._log_api_call(endpoint, method, 0, response_time, {}, error_message=str(e))
-            return None
+        return url, params, headers
     
-    def _log_api_call(self, endpoint, method, status_code, response_time, headers, error_message=''):
+    def _log_api_call(self, endpoint, method, status_code, response_time, headers, error_message='', attempt=1):
         """Log API call for monitoring"""
         
+        # Errors, 429s and slow calls are always kept; fast successes may be sampled out
+        sample_weight = self.log_sampler.sample_weight(self.social_account.platform, endpoint, status_code, response_time)
+        if not sample_weight:
+            return
+        
         # Extract rate limit info from headers
-        rate_limit_remaining = None
+        rate_limit_remaining, reset_timestamp = parse_rate_limit_headers(self.social_account.platform, headers)
         rate_limit_reset = None
+        if reset_timestamp:
+            rate_limit_reset = datetime.fromtimestamp(reset_timestamp, tz=dt_timezone.utc)
         
-        if self.social_account.platform == 'linkedin':
-            rate_limit_remaining = headers.get('X-Restli-Protocol-Version')
-        elif self.social_account.platform == 'twitter':
-            rate_limit_remaining = headers.get('x-rate-limit-remaining')
-            reset_timestamp = headers.get('x-rate-limit-reset')
-            if reset_timestamp:
-                rate_limit_reset = datetime.fromtimestamp(int(reset_timestamp))
-        
-        APICallLog.objects.create(
-            user=self.social_account.user,
+        # Written in batches by the sink; stamped now, not at flush time
+        api_log_sink.submit(APICallLog(
+            user_id=self.social_account.user_id,
             social_account=self.social_account,
             endpoint=endpoint,
             method=method.upper(),
             status_code=status_code,
             response_time=response_time,
-            rate_limit_remaining=int(rate_limit_remaining) if rate_limit_remaining else None,
+            rate_limit_remaining=rate_limit_remaining,
             rate_limit_reset=rate_limit_reset,
-            error_message=error_message
-        )
+            error_message=error_message,
+            attempt=attempt,
+            sample_weight=sample_weight,
+            created_at=timezone.now(),
+        ))
 
 
 class SessionManager:
@@ -368,19 +630,26 @@ class SessionManager:
     
     @staticmethod
     def create_oauth_session(user, platform, redirect_uri, state=None, code_verifier=None):
-        """Create OAuth session data"""
+        """Create OAuth session data; send the returned object's oauth_state to the provider"""
+        # Signed and cache modes mint their own state and write nothing to the database
+        store = stateless_store()
+        if store is not None:
+            return store.issue(user, platform, code_verifier)
+        
+        session_sweeper.ensure_running()
+        SessionManager.cleanup_user_platform_sessions(user, platform)
         
         if not state:
             state = secrets.token_urlsafe(32)
         
-        expires_at = timezone.now() + timedelta(minutes=30)  # 30 minute expiration
+        expires_at = timezone.now() + timedelta(seconds=oauth_state_settings()['MAX_AGE'])
         
         session_data = SessionData.objects.create(
             user=user,
             oauth_state=state,
             code_verifier=code_verifier or '',
             redirect_uri=redirect_uri,
-            temp_data={'platform': platform},
+            platform=platform,
             expires_at=expires_at
         )
         
@@ -389,6 +658,9 @@ class SessionManager:
     @staticmethod
     def get_oauth_session(state):
         """Get OAuth session by state"""
+        store = stateless_store()
+        if store is not None:
+            return store.load(state)
         try:
             session = SessionData.objects.get(oauth_state=state)
             if session.is_expired():
@@ -398,17 +670,65 @@ class SessionManager:
         except SessionData.DoesNotExist:
             return None
     
+    @staticmethod
+    def consume_oauth_session(state, user=None):
+        """
+        Return the session for state and delete it in one step, or None if the
+        state is unknown, expired, belongs to another user or was already used
+        """
+        store = stateless_store()
+        if store is not None:
+            return store.consume(state, user_id=user.pk if user is not None else None)
+        
+        now = timezone.now()
+        connection = connections[router.db_for_write(SessionData)]
+        if connection.vendor in ('sqlite', 'postgresql') and connection.features.can_return_columns_from_insert:
+            return SessionManager._delete_returning(connection, state, user, now)
+        
+        # No DELETE ... RETURNING: only the caller whose delete removes the row gets it
+        with transaction.atomic(using=connection.alias):
+            sessions = SessionData.objects.filter(oauth_state=state, expires_at__gt=now)
+            if user is not None:
+                sessions = sessions.filter(user=user)
+            session = sessions.select_for_update().first()
+            if session is None or not SessionData.objects.filter(pk=session.pk).delete()[0]:
+                return None
+            return session
+    
+    # Columns an OAuth callback reads; the rest of the returned instance is deferred
+    CONSUMED_FIELDS = ('id', 'user_id', 'social_account_id', 'platform', 'oauth_state', 'code_verifier', 'redirect_uri')
+    
+    @staticmethod
+    def _delete_returning(connection, state, user, now):
+        qn = connection.ops.quote_name
+        opts = SessionData._meta
+        columns = ', '.join(qn(opts.get_field(name).column) for name in SessionManager.CONSUMED_FIELDS)
+        sql = (
+            f"DELETE FROM {qn(opts.db_table)} "
+            f"WHERE {qn(opts.get_field('oauth_state').column)} = %s AND {qn(opts.get_field('expires_at').column)} > %s"
+        )
+        params = [state, connection.ops.adapt_datetimefield_value(now)]
+        if user is not None:
+            sql += f" AND {qn(opts.get_field('user').column)} = %s"
+            params.append(user.pk)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{sql} RETURNING {columns}", params)
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return SessionData.from_db(connection.alias, SessionManager.CONSUMED_FIELDS, row)
+    
     @staticmethod
     def cleanup_expired_sessions():
-        """Clean up expired session data"""
-        SessionData.objects.filter(expires_at__lt=timezone.now()).delete()
+        """Clean up expired session data (and Django sessions) in batches; returns sweep statistics"""
+        return session_sweeper.run()
     
     @staticmethod
     def cleanup_user_platform_sessions(user, platform):
         """Clean up sessions for a specific user and platform"""
         SessionData.objects.filter(
             user=user,
-            temp_data__platform=platform
+            platform=platform
         ).delete()
 
 
@@ -426,7 +746,7 @@ class AnalyticsCollector:
             social_account.posts_count = metrics_data.get('tweet_count', 0)
         
         social_account.last_sync = timezone.now()
-        social_account.save()
+        social_account.save(update_fields=['follower_count', 'following_count', 'posts_count', 'last_sync', 'updated_at'])
     
     @staticmethod
     def collect_daily_analytics(social_account, date=None):
@@ -6,8 +6,10 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.views.decorators.cache import never_cache
+from urllib.parse import quote
+from accounts import transport
 from accounts.utils import TokenManager, SessionManager, APIClient
-from accounts.models import SocialMediaAccount, SessionData
+from accounts.models import SocialMediaAccount
 from .models import LinkedInProfile
 import secrets
 
@@ -83,23 +85,17 @@ def linkedin_profile(request):
 def linkedin_login(request):
     """Initiate LinkedIn OAuth flow"""
     
-    # Clean up any existing sessions for this user and platform
-    SessionData.objects.filter(
-        user=request.user,
-        temp_data__platform='linkedin'
-    ).delete()
-    
     # Generate state parameter for security
     state = secrets.token_urlsafe(32)
     timestamp = str(int(timezone.now().timestamp()))
     
-    # Create session data
-    SessionManager.create_oauth_session(
+    # Create session data (stateless modes mint their own state)
+    state = SessionManager.create_oauth_session(
         user=request.user,
         platform='linkedin',
         redirect_uri=settings.LINKEDIN_REDIRECT_URI,
         state=state
-    )
+    ).oauth_state
     
     auth_url = (
         f"https://www.linkedin.com/oauth/v2/authorization"
@@ -107,7 +103,7 @@ def linkedin_login(request):
         f"&client_id={settings.LINKEDIN_CLIENT_ID}"
         f"&redirect_uri={settings.LINKEDIN_REDIRECT_URI}"
         f"&scope=openid%20profile%20email"
-        f"&state={state}"
+        f"&state={quote(state)}"
         f"&prompt=consent"  # Force fresh consent screen
         f"&approval_prompt=force"  # Force approval
         f"&access_type=offline"  # Request offline access
@@ -137,17 +133,12 @@ def linkedin_callback(request):
         messages.error(request, 'Invalid LinkedIn callback')
         return redirect('dashboard')
     
-    # Verify state parameter and ensure session belongs to current user
-    session_data = SessionManager.get_oauth_session(state)
+    # Verify state parameter belongs to current user and spend it, so a replayed callback fails here
+    session_data = SessionManager.consume_oauth_session(state, request.user)
     if not session_data:
         messages.error(request, 'Invalid or expired session state')
         return redirect('dashboard')
     
-    if session_data.user != request.user:
-        messages.error(request, 'Session does not belong to current user')
-        session_data.delete()  # Clean up invalid session
-        return redirect('dashboard')
-    
     try:
         # Exchange code for access token
         token_url = "https://www.linkedin.com/oauth/v2/accessToken"
@@ -159,7 +150,7 @@ def linkedin_callback(request):
             'client_secret': settings.LINKEDIN_CLIENT_SECRET,
         }
         
-        token_response = requests.post(token_url, data=token_data)
+        token_response = transport.post('linkedin', token_url, data=token_data)
         
         if token_response.status_code != 200:
             messages.error(request, 'Failed to get access token from LinkedIn')
@@ -174,7 +165,8 @@ def linkedin_callback(request):
             return redirect('dashboard')
         
         # Get user profile information
-        profile_response = requests.get(
+        profile_response = transport.get(
+            'linkedin',
             'https://api.linkedin.com/v2/userinfo',
             headers={'Authorization': f'Bearer {access_token}'}
         )
@@ -217,9 +209,6 @@ def linkedin_callback(request):
             }
         )
         
-        # Clean up session data
-        session_data.delete()
-        
         messages.success(request, 'LinkedIn account connected successfully!')
         return redirect('dashboard')
         
@@ -249,7 +238,7 @@ def linkedin_callback(request):
     }
 
     try:
-        response = requests.post(token_url, data=data)
+        response = transport.post('linkedin', token_url, data=data)
         response.raise_for_status()  # Raises an HTTPError for bad responses
         
         token_data = response.json()
@@ -264,7 +253,7 @@ def linkedin_callback(request):
         headers = {'Authorization': f'Bearer {access_token}'}
         profile_url = 'https://api.linkedin.com/v2/userinfo'
         
-        profile_response = requests.get(profile_url, headers=headers)
+        profile_response = transport.get('linkedin', profile_url, headers=headers)
         profile_response.raise_for_status()
         profile_data = profile_response.json()
 
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -80,9 +81,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # API call logs and rollups get their own file (and write lock); see accounts/routers.py
+    'telemetry': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'telemetry.sqlite3',
+    },
 }
 
+DATABASE_ROUTERS = ['accounts.routers.TelemetryRouter']
+TELEMETRY_DATABASE = 'telemetry'
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'shared' holds state every worker process must agree on (API rate-limit
+# budgets, circuit breaker windows). Its backend must have an atomic incr(),
+# so in production set SHARED_CACHE_URL=redis://host:6379/1 (needs the redis
+# package). Without it each process keeps its own copy in memory, which
+# suits a single dev server.
+# Do not use DatabaseCache here: its incr() is a get followed by a set, and
+# it would write to db.sqlite3 on every API call.
+
+SHARED_CACHE_URL = os.environ.get('SHARED_CACHE_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': SHARED_CACHE_URL,
+    } if SHARED_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'connectly-shared',
+        'OPTIONS': {'MAX_ENTRIES': 100000},  # The default 300 would cull live budgets
+    },
+}
+
+RATE_LIMIT_CACHE = 'shared'
+RATE_LIMIT_MAX_WAIT = 5  # Seconds a call may block waiting for its budget to reset
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
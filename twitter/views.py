@@ -1,4 +1,3 @@
-import requests
 import base64
 import hashlib
 import secrets
@@ -9,8 +8,9 @@ from django.contrib import messages
 from django.views.decorators.cache import never_cache
 from django.utils import timezone
 from urllib.parse import urlencode
+from accounts import transport
 from accounts.utils import TokenManager, SessionManager, APIClient
-from accounts.models import SocialMediaAccount, SessionData
+from accounts.models import SocialMediaAccount
 from .models import TwitterProfile
 
 
@@ -67,26 +67,20 @@ def twitter_profile(request):
 def twitter_login(request):
     """Initiate Twitter OAuth flow with PKCE"""
     
-    # Clean up any existing sessions for this user and platform
-    SessionData.objects.filter(
-        user=request.user,
-        temp_data__platform='twitter'
-    ).delete()
-    
     # Generate PKCE parameters
     code_verifier = base64.urlsafe_b64encode(secrets.token_bytes(32)).decode('utf-8').rstrip('=')
     code_challenge = base64.urlsafe_b64encode(hashlib.sha256(code_verifier.encode()).digest()).decode('utf-8').rstrip('=')
     state = secrets.token_urlsafe(32)
     timestamp = str(int(timezone.now().timestamp()))
     
-    # Create session data with PKCE parameters
-    SessionManager.create_oauth_session(
+    # Create session data with PKCE parameters (stateless modes mint their own state)
+    state = SessionManager.create_oauth_session(
         user=request.user,
         platform='twitter',
         redirect_uri=settings.TWITTER_REDIRECT_URI,
         state=state,
         code_verifier=code_verifier
-    )
+    ).oauth_state
     
     # Build authorization URL
     auth_params = {
@@ -126,9 +120,9 @@ def twitter_callback(request):
         messages.error(request, 'Invalid Twitter callback')
         return redirect('dashboard')
     
-    # Verify state parameter and get session data
-    session_data = SessionManager.get_oauth_session(state)
-    if not session_data or session_data.user != request.user:
+    # Verify state parameter and spend it, so a refreshed or replayed callback fails here
+    session_data = SessionManager.consume_oauth_session(state, request.user)
+    if not session_data:
         messages.error(request, 'Invalid session state')
         return redirect('dashboard')
     
@@ -152,7 +146,7 @@ def twitter_callback(request):
             'Content-Type': 'application/x-www-form-urlencoded',
         }
         
-        token_response = requests.post(token_url, data=token_data, headers=headers)
+        token_response = transport.post('twitter', token_url, data=token_data, headers=headers)
         
         if token_response.status_code != 200:
             messages.error(request, 'Failed to get access token from Twitter')
@@ -168,7 +162,8 @@ def twitter_callback(request):
             return redirect('dashboard')
         
         # Get user profile information
-        profile_response = requests.get(
+        profile_response = transport.get(
+            'twitter',
             'https://api.twitter.com/2/users/me?user.fields=description,location,profile_image_url,public_metrics,verified,created_at',
             headers={'Authorization': f'Bearer {access_token}'}
         )
@@ -233,9 +228,6 @@ def twitter_callback(request):
             twitter_profile.profile_image_url = profile_data.get('profile_image_url', '')
             twitter_profile.save()
         
-        # Clean up session data
-        session_data.delete()
-        
         messages.success(request, 'Twitter account connected successfully!')
         return redirect('dashboard')
         